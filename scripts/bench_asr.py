@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Accuracy/latency benchmark for the voice recognizer tiers.
+
+    python3 scripts/bench_asr.py samples.tsv [--fast tiny.en] [--full small.en] [--repeat 3]
+
+The manifest is a TSV of `<wav path>\t<expected transcript>` lines (paths relative to the
+manifest; blank lines and # comments are skipped), see asr_samples.example.tsv. Record the
+WAVs on the Pi itself, e.g. `arecord -f S16_LE -r 16000 -c 1 -d 3 skip.wav`.
+
+Each sample is decoded by the fast tier alone, the full tier alone and the two-tier
+recognizer (same prompt and escalation rule as voice_loop.py). Reported per tier:
+exact-match rate and word error rate against the expected text, mean/p50/p95 latency,
+and for two-tier how often it escalated.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from artist_match import ArtistIndex, normalize_text
+from asr import WHISPER_FAST_MODEL, WHISPER_MODEL, TwoTierRecognizer, WhisperTranscriber, pcm_to_audio, read_wav_pcm
+from voice_loop import COMMAND_PHRASES, DB_PATH, WHISPER_PROMPT_ARTISTS, LibraryDB, fast_tier_accepts
+
+
+def load_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            wav, _, expected = line.partition("\t")
+            wav = wav if os.path.isabs(wav) else os.path.join(base, wav)
+            if not os.path.exists(wav):
+                print(f"skip (missing): {wav}", file=sys.stderr)
+                continue
+            pcm = read_wav_pcm(wav)
+            if pcm is None:
+                print(f"skip (not a 16-bit WAV): {wav}", file=sys.stderr)
+                continue
+            samples.append((wav, pcm, normalize_text(expected)))
+    return samples
+
+
+def word_errors(ref, hyp):
+    """Word-level edit distance."""
+    r, h = ref.split(), hyp.split()
+    prev = list(range(len(h) + 1))
+    for i, rw in enumerate(r, 1):
+        cur = [i]
+        for j, hw in enumerate(h, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (rw != hw)))
+        prev = cur
+    return prev[-1]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def load_vocabulary():
+    if not os.path.exists(DB_PATH):
+        return ArtistIndex([]), []
+    db = LibraryDB(DB_PATH)
+    try:
+        return ArtistIndex(db.get_artists()), db.get_top_artists(WHISPER_PROMPT_ARTISTS)
+    finally:
+        db.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark fast / full / two-tier speech recognition.")
+    ap.add_argument("manifest")
+    ap.add_argument("--fast", default=WHISPER_FAST_MODEL or "tiny.en", help="fast-tier model")
+    ap.add_argument("--full", default=WHISPER_MODEL, help="full-tier model")
+    ap.add_argument("--repeat", type=int, default=1, help="decode each sample this many times")
+    args = ap.parse_args()
+
+    samples = load_manifest(args.manifest)
+    if not samples:
+        print("No samples.")
+        return 1
+
+    artists, top_artists = load_vocabulary()
+    # timings of bench runs shouldn't mix into the production report
+    fast = WhisperTranscriber(model_name=args.fast, timings_path=None)
+    full = WhisperTranscriber(model_name=args.full, timings_path=None)
+    two = TwoTierRecognizer(full=full, fast=fast)
+    two.set_vocabulary(COMMAND_PHRASES, top_artists)
+    two.load()
+
+    tiers = {
+        f"fast ({args.fast})": lambda audio: fast.transcribe_detail(audio, two.prompt),
+        f"full ({args.full})": lambda audio: full.transcribe_detail(audio, two.prompt),
+        "two-tier": lambda audio: two.transcribe_audio(audio, accept=lambda t: fast_tier_accepts(t, artists)),
+    }
+
+    print(f"{len(samples)} samples x {args.repeat}, load: fast {fast.load_s:.2f}s, full {full.load_s:.2f}s")
+    print(f"{'tier':<24} {'exact':>6} {'WER':>6} {'mean':>7} {'p50':>7} {'p95':>7} {'escal':>6}")
+    for name, run in tiers.items():
+        latencies, exact, errors, words, escalated = [], 0, 0, 0, 0
+        for wav, (pcm, rate, nchan), expected in samples:
+            for _ in range(args.repeat):
+                audio = pcm_to_audio(pcm, rate, nchan)
+                t0 = time.monotonic()
+                result = run(audio)
+                latencies.append(time.monotonic() - t0)
+                got = normalize_text(result.text)
+                exact += got == expected
+                errors += word_errors(expected, got)
+                words += max(1, len(expected.split()))
+                escalated += result.tier == "full"
+        n = len(latencies)
+        print(f"{name:<24} {exact / n:>6.0%} {errors / words:>6.1%} {sum(latencies) / n:>6.2f}s "
+              f"{percentile(latencies, 50):>6.2f}s {percentile(latencies, 95):>6.2f}s "
+              f"{(f'{escalated / n:.0%}' if name == 'two-tier' else '-'):>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,47 +2,12 @@
 import json
 import os
 import sys
-import sqlite3
 import time
 from pathlib import Path
 
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
-from config import DB_PATH, INDEX_JSON_PATH
-
-def connect(db_path: str) -> sqlite3.Connection:
-    con = sqlite3.connect(db_path)
-    con.execute("PRAGMA journal_mode=WAL;")
-    con.execute("PRAGMA synchronous=NORMAL;")
-    return con
-
-SCHEMA_SQL = """
-CREATE TABLE IF NOT EXISTS tracks (
-  path           TEXT PRIMARY KEY,
-  artist         TEXT,
-  artist_sort    TEXT,
-  album          TEXT,
-  title          TEXT,
-  tracknumber    INTEGER,
-  year           INTEGER,
-  duration       REAL,
-  bitrate        INTEGER,
-  samplerate     INTEGER,
-  channels       INTEGER,
-  mtime          INTEGER NOT NULL,
-  size           INTEGER NOT NULL,
-  ext            TEXT,
-  added_at       INTEGER NOT NULL,
-  updated_at     INTEGER NOT NULL
-);
-CREATE INDEX IF NOT EXISTS idx_tracks_artist ON tracks(artist);
-CREATE INDEX IF NOT EXISTS idx_tracks_year   ON tracks(year);
-CREATE INDEX IF NOT EXISTS idx_tracks_dur    ON tracks(duration);
-
-CREATE TABLE IF NOT EXISTS scan_state (
-  key   TEXT PRIMARY KEY,
-  value TEXT NOT NULL
-);
-"""
+from config import DB_PATH, INDEX_JSON_PATH, INDEX_NDJSON_PATH
+from library_index import connect, ensure_schema
 
 def norm_int(v):
     try:
@@ -59,8 +24,18 @@ def norm_float(v):
     except Exception:
         return None
 
-def main():
-    now = int(time.time())
+def iter_source_tracks():
+    """Yield track dicts, streaming the NDJSON index if present, else loading the legacy JSON."""
+    if os.path.exists(INDEX_NDJSON_PATH):
+        with open(INDEX_NDJSON_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    t = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(t, dict) and "music_root" not in t:
+                    yield t
+        return
 
     with open(INDEX_JSON_PATH, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -69,36 +44,45 @@ def main():
     tracks = data["tracks"] if isinstance(data, dict) and "tracks" in data else data
     if not isinstance(tracks, list):
         raise SystemExit("JSON format unexpected; expected list or {'tracks':[...]}")
+    yield from tracks
+
+def main():
+    now = int(time.time())
+    source = INDEX_NDJSON_PATH if os.path.exists(INDEX_NDJSON_PATH) else INDEX_JSON_PATH
 
     con = connect(DB_PATH)
-    con.executescript(SCHEMA_SQL)
+    ensure_schema(con)
 
-    # If old JSON doesn’t have mtime/size, set to 0 and let the incremental updater fix it later.
-    rows = []
-    for t in tracks:
-        path = t.get("path") or t.get("filepath") or t.get("file")
-        if not path:
-            continue
+    imported = 0
 
-        ext = Path(path).suffix.lower()
-        rows.append((
-            path,
-            t.get("artist"),
-            t.get("artist_sort"),
-            t.get("album"),
-            t.get("title"),
-            norm_int(t.get("tracknumber") or t.get("track")),
-            norm_int(t.get("year") or t.get("date")),
-            norm_float(t.get("duration")),
-            norm_int(t.get("bitrate")),
-            norm_int(t.get("samplerate")),
-            norm_int(t.get("channels")),
-            norm_int(t.get("mtime")) or 0,
-            norm_int(t.get("size")) or 0,
-            ext,
-            now,
-            now,
-        ))
+    # If old JSON doesn’t have mtime/size, set to 0 and let the incremental updater fix it later.
+    def rows():
+        nonlocal imported
+        for t in iter_source_tracks():
+            path = t.get("path") or t.get("filepath") or t.get("file")
+            if not path:
+                continue
+
+            ext = Path(path).suffix.lower()
+            imported += 1
+            yield (
+                path,
+                t.get("artist"),
+                t.get("artist_sort"),
+                t.get("album"),
+                t.get("title"),
+                norm_int(t.get("tracknumber") or t.get("track")),
+                norm_int(t.get("year") or t.get("date")),
+                norm_float(t.get("duration")),
+                norm_int(t.get("bitrate")),
+                norm_int(t.get("samplerate")),
+                norm_int(t.get("channels")),
+                norm_int(t.get("mtime")) or 0,
+                norm_int(t.get("size")) or 0,
+                ext,
+                now,
+                now,
+            )
 
     con.executemany("""
       INSERT INTO tracks(
@@ -121,14 +105,14 @@ def main():
         size=CASE WHEN excluded.size!=0 THEN excluded.size ELSE tracks.size END,
         ext=excluded.ext,
         updated_at=excluded.updated_at
-    """, rows)
+    """, rows())
 
     con.execute("INSERT OR REPLACE INTO scan_state(key,value) VALUES(?,?)",
                 ("migrated_from_json_at", str(now)))
     con.commit()
     con.close()
 
-    print(f"Imported {len(rows)} tracks into {DB_PATH} from {INDEX_JSON_PATH}")
+    print(f"Imported {imported} tracks into {DB_PATH} from {source}")
 
 if __name__ == "__main__":
     main()
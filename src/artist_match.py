@@ -0,0 +1,276 @@
+"""
+Artist lookup index for voice matching.
+
+Built once per artist-list refresh so matching a transcript costs roughly
+O(len(transcript)) instead of O(number of artists):
+
+- names are normalized up front
+- a character-level Aho-Corasick automaton finds the longest artist name
+  contained anywhere in the transcript
+- a token -> artists inverted index drives the token-overlap fallback
+- character-trigram and phonetic-key indexes rank fuzzy candidates for
+  misheard names ("bjork", "sigur ross")
+
+The built index is pickled next to jukebox.db and reused while the artist
+list is unchanged.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+TOKEN_MATCH_THRESHOLD = 0.60
+FUZZY_THRESHOLD = float(os.getenv("JUKEBOX_ARTIST_FUZZY_MIN", "0.75"))
+PHONETIC_SCORE = 0.85  # score given to a phonetic-key hit with weak trigram overlap
+PHONETIC_MIN_DICE = 0.2  # ...but only when the spellings share something
+MAX_SPAN_TOKENS = 4
+INDEX_VERSION = 1
+
+# words that never start or end an artist span in a spoken command
+FILLER_WORDS = {
+    "play", "shuffle", "put", "start", "by", "artist", "some", "something", "music",
+    "songs", "song", "tracks", "from", "me", "please", "random", "genre", "like", "around",
+}
+
+# crude English sound classes; good enough to line up Whisper's spelling guesses
+_PHONETIC_RULES = [
+    (re.compile(r"ph"), "f"), (re.compile(r"ck"), "k"), (re.compile(r"sch"), "sk"),
+    (re.compile(r"^kn"), "n"), (re.compile(r"^wr"), "r"), (re.compile(r"gh"), "g"),
+    (re.compile(r"th"), "t"), (re.compile(r"[aeiouy]+"), "a"),
+]
+_PHONETIC_CLASS = str.maketrans("bfpvcgjkqsxzdtlmnrhw", "11112222222233455600")
+
+
+def fold_accents(t: str) -> str:
+    return "".join(ch for ch in unicodedata.normalize("NFKD", t) if not unicodedata.combining(ch))
+
+
+def normalize_text(t: str) -> str:
+    t = fold_accents(t).strip().lower()
+    # keep digits/letters/spaces, drop most punctuation
+    t = re.sub(r"[^a-z0-9\s']", " ", t)
+    t = re.sub(r"\s+", " ", t).strip()
+    return t
+
+
+def trigrams(n: str) -> Set[str]:
+    padded = f"  {n} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def phonetic_key(n: str) -> str:
+    """Sound-alike key for a normalized name: "seeger ross", "sigur ros" and "motor head"/"motorhead" agree."""
+    tok = n.replace("'", "").replace(" ", "")
+    for rx, rep in _PHONETIC_RULES:
+        tok = rx.sub(rep, tok)
+    code = tok.translate(_PHONETIC_CLASS)
+    if not code:
+        return ""
+    # vowels/h/w only matter at the very start
+    code = code[0] + re.sub(r"[a0]", "", code[1:])
+    return re.sub(r"(.)\1+", r"\1", code)
+
+
+def artist_index_path(db_path: str) -> str:
+    return os.path.splitext(db_path)[0] + ".artists.idx"
+
+
+def artists_signature(artists: Sequence[str]) -> str:
+    return hashlib.sha1("\n".join(artists).encode("utf-8")).hexdigest()
+
+
+class ArtistIndex:
+    def __init__(self, artists: Sequence[str]) -> None:
+        self.artists: List[str] = list(artists)
+        self.signature = artists_signature(self.artists)
+        self.norm: List[str] = [normalize_text(a) for a in self.artists]
+        self.tokens: List[Set[str]] = [set(n.split()) for n in self.norm]
+
+        self.by_token: Dict[str, List[int]] = {}
+        for i, toks in enumerate(self.tokens):
+            for tok in toks:
+                self.by_token.setdefault(tok, []).append(i)
+
+        self.gram_count: List[int] = []
+        self.by_gram: Dict[str, List[int]] = {}
+        self.by_phonetic: Dict[str, List[int]] = {}
+        for i, n in enumerate(self.norm):
+            grams = trigrams(n) if n else set()
+            self.gram_count.append(len(grams))
+            for g in grams:
+                self.by_gram.setdefault(g, []).append(i)
+            key = phonetic_key(n)
+            if len(key) >= 3:
+                self.by_phonetic.setdefault(key, []).append(i)
+
+        self._build_automaton()
+
+    def __len__(self) -> int:
+        return len(self.artists)
+
+    @classmethod
+    def load_or_build(cls, artists: Sequence[str], path: Optional[str] = None) -> "ArtistIndex":
+        """Reuse the pickled index at path if it was built from the same artist list."""
+        artists = list(artists)
+        if path:
+            try:
+                with open(path, "rb") as f:
+                    version, signature, idx = pickle.load(f)
+                if version == INDEX_VERSION and signature == artists_signature(artists):
+                    return idx
+            except Exception:
+                pass
+
+        idx = cls(artists)
+        if path:
+            idx.save(path)
+        return idx
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump((INDEX_VERSION, self.signature, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a read-only or missing dir only costs a rebuild next time
+
+    def _rank(self, i: int) -> Tuple[int, int]:
+        # longest original name wins; ties go to the earlier artist (list order)
+        return (len(self.artists[i]), -i)
+
+    def _better(self, a: int, b: int) -> int:
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        return a if self._rank(a) >= self._rank(b) else b
+
+    def _build_automaton(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        best: List[int] = [-1]  # best artist ending at this node (incl. via fail links)
+
+        for i, n in enumerate(self.norm):
+            if not n:
+                continue
+            node = 0
+            for ch in n:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    best.append(-1)
+                node = nxt
+            best[node] = self._better(best[node], i)
+
+        fail = [0] * len(goto)
+        q = deque(goto[0].values())
+        while q:
+            node = q.popleft()
+            best[node] = self._better(best[node], best[fail[node]])
+            for ch, nxt in goto[node].items():
+                q.append(nxt)
+                if node == 0:
+                    continue  # depth-1 nodes fail back to the root
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+
+    def longest_contained(self, t: str) -> Optional[str]:
+        """Longest artist whose normalized name is a substring of normalized text t."""
+        goto, fail, best = self._goto, self._fail, self._best
+        node = 0
+        found = -1
+        for ch in t:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] >= 0:
+                found = self._better(found, best[node])
+        return self.artists[found] if found >= 0 else None
+
+    def best_token_match(self, t: str) -> Tuple[Optional[str], float]:
+        """Best token-overlap match for normalized text t, with its score."""
+        overlap: Dict[int, int] = {}
+        for tok in set(t.split()):
+            for i in self.by_token.get(tok, ()):
+                overlap[i] = overlap.get(i, 0) + 1
+
+        best = None
+        best_score = 0.0
+        for i in sorted(overlap):
+            score = overlap[i] / max(1, len(self.tokens[i]))
+            # slight bias towards longer names when tied
+            score += min(0.15, len(self.norm[i]) / 200.0)
+            if score > best_score:
+                best_score = score
+                best = self.artists[i]
+        return best, best_score
+
+    def fuzzy_candidates(self, transcript: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Ranked (artist, score) candidates for possibly misheard names in transcript.
+        Every 1..MAX_SPAN_TOKENS word span is scored against each artist by trigram
+        Dice similarity, and a phonetic-key hit lifts the score to PHONETIC_SCORE.
+        """
+        words = normalize_text(transcript).split()
+        scores: Dict[int, float] = {}
+
+        for start in range(len(words)):
+            if words[start] in FILLER_WORDS:
+                continue
+            for end in range(start + 1, min(len(words), start + MAX_SPAN_TOKENS) + 1):
+                if words[end - 1] in FILLER_WORDS:
+                    continue
+                span = " ".join(words[start:end])
+                grams = trigrams(span)
+                shared: Dict[int, int] = {}
+                for g in grams:
+                    for i in self.by_gram.get(g, ()):
+                        shared[i] = shared.get(i, 0) + 1
+                for i, n in shared.items():
+                    dice = 2.0 * n / (len(grams) + self.gram_count[i])
+                    if dice > scores.get(i, 0.0):
+                        scores[i] = dice
+                for i in self.by_phonetic.get(phonetic_key(span), ()):
+                    if scores.get(i, 0.0) >= PHONETIC_MIN_DICE:
+                        scores[i] = max(scores[i], PHONETIC_SCORE)
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], -len(self.artists[kv[0]]), kv[0]))
+        return [(self.artists[i], round(score, 3)) for i, score in ranked[:limit]]
+
+    def fuzzy_match(self, transcript: str, threshold: float = FUZZY_THRESHOLD) -> Optional[str]:
+        candidates = self.fuzzy_candidates(transcript, limit=1)
+        if candidates and candidates[0][1] >= threshold:
+            return candidates[0][0]
+        return None
+
+    def best_match(self, transcript: str) -> Optional[str]:
+        """
+        Attempts to identify the intended artist from transcript using:
+        1) exact/contains match
+        2) token overlap scoring
+        """
+        if not self.artists:
+            return None
+
+        t = normalize_text(transcript)
+        if not t:
+            return None
+
+        contained = self.longest_contained(t)
+        if contained:
+            return contained
+
+        best, score = self.best_token_match(t)
+        return best if score >= TOKEN_MATCH_THRESHOLD else None
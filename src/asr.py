@@ -0,0 +1,291 @@
+"""
+faster-whisper wrapper shared by the voice loops.
+
+- audio goes in as in-memory float32 (no file re-open / ffmpeg decode per clip)
+- the model is warmed up with one inference at load time
+- cpu_threads / num_workers are configurable
+- model load + warm-up timings are appended to a JSON report so model sizes
+  (tiny.en / base.en / small.en) can be compared by measured latency
+- TwoTierRecognizer runs a small model prompted with the command vocabulary
+  first and only escalates to the full model when it is unsure
+"""
+
+import io
+import json
+import os
+import platform
+import time
+import wave
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Union
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small.en")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")  # cpu on Pi
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # good on Pi
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = ctranslate2 default
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+WHISPER_WARMUP_SECONDS = float(os.getenv("WHISPER_WARMUP_SECONDS", "1.0"))
+WHISPER_TIMINGS_PATH = os.getenv("WHISPER_TIMINGS_PATH", "/home/dan/whisper_timings.json")
+WHISPER_FAST_MODEL = os.getenv("WHISPER_FAST_MODEL", "tiny.en")  # "" = single tier
+WHISPER_FAST_MIN_LOGPROB = float(os.getenv("WHISPER_FAST_MIN_LOGPROB", "-0.6"))
+WHISPER_FAST_MAX_NO_SPEECH = float(os.getenv("WHISPER_FAST_MAX_NO_SPEECH", "0.6"))
+PROMPT_MAX_CHARS = 600  # whisper prompts are capped at ~224 tokens
+TIMINGS_KEEP = 20  # runs kept per model/config
+
+WHISPER_RATE = 16000  # whisper's native rate; other rates go through the WAV decoder
+
+
+def _log(msg: str) -> None:
+    ts = time.strftime("%H:%M:%S")
+    print(f"[{ts}] {msg}", flush=True)
+
+
+@dataclass
+class Transcript:
+    text: str
+    avg_logprob: float = 0.0
+    no_speech_prob: float = 0.0
+    seconds: float = 0.0
+    tier: str = ""
+    escalated: str = ""  # why the fast tier's answer was not used
+
+
+def pcm_to_float32(pcm: bytes, nchan: int = 1):
+    """int16 PCM -> mono float32 in [-1, 1], the array form faster-whisper accepts directly."""
+    import numpy as np  # faster-whisper already depends on numpy
+
+    a = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    if nchan > 1:
+        a = a[: len(a) - len(a) % nchan].reshape(-1, nchan).mean(axis=1)
+    return a.astype(np.float32) / 32768.0
+
+
+def pcm_to_audio(pcm: bytes, rate: int = WHISPER_RATE, nchan: int = 1):
+    """Input for model.transcribe(): float32 array at 16 kHz, else an in-memory WAV for faster-whisper to resample."""
+    if rate == WHISPER_RATE:
+        return pcm_to_float32(pcm, nchan)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(nchan)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    buf.seek(0)
+    return buf
+
+
+def read_wav_pcm(path: str):
+    """(pcm, rate, nchan) for a 16-bit WAV file, or None if it is not one."""
+    try:
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                return None
+            return wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels()
+    except (wave.Error, EOFError):
+        return None
+
+
+def record_timing(entry: Dict[str, Any], path: str = WHISPER_TIMINGS_PATH) -> None:
+    """Append one run to the timings report, keyed by model/compute/thread config."""
+    if not path:
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        report = {}
+
+    key = f"{entry['model']}|{entry['device']}/{entry['compute_type']}|t{entry['cpu_threads']}w{entry['num_workers']}"
+    runs: List[Dict[str, Any]] = report.get(key, {}).get("runs", [])
+    runs = (runs + [entry])[-TIMINGS_KEEP:]
+
+    def avg(k: str) -> float:
+        return round(sum(r[k] for r in runs) / len(runs), 3)
+
+    report[key] = {"avg_load_s": avg("load_s"), "avg_warmup_rtf": avg("warmup_rtf"), "runs": runs}
+
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        _log(f"Whisper timing report not written: {e}")
+
+
+class WhisperTranscriber:
+    def __init__(
+        self,
+        model_name: str = WHISPER_MODEL,
+        device: str = WHISPER_DEVICE,
+        compute_type: str = WHISPER_COMPUTE_TYPE,
+        cpu_threads: int = WHISPER_CPU_THREADS,
+        num_workers: int = WHISPER_NUM_WORKERS,
+        timings_path: Optional[str] = WHISPER_TIMINGS_PATH,
+    ) -> None:
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.timings_path = timings_path
+        self.model = None
+        self.load_s: Optional[float] = None
+        self.warmup_s: Optional[float] = None
+
+    def load(self) -> None:
+        from faster_whisper import WhisperModel  # type: ignore
+
+        _log(f"Loading whisper model: {self.model_name} ({self.device}/{self.compute_type}, "
+             f"threads={self.cpu_threads or 'auto'}, workers={self.num_workers})")
+        t0 = time.monotonic()
+        self.model = WhisperModel(
+            self.model_name,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+            num_workers=self.num_workers,
+        )
+        self.load_s = time.monotonic() - t0
+        self.warmup()
+        _log(f"Whisper ready (load {self.load_s:.2f}s, warm-up {self.warmup_s:.2f}s).")
+
+        record_timing({
+            "model": self.model_name,
+            "device": self.device,
+            "compute_type": self.compute_type,
+            "cpu_threads": self.cpu_threads,
+            "num_workers": self.num_workers,
+            "host": platform.node(),
+            "ts": int(time.time()),
+            "load_s": round(self.load_s, 3),
+            "warmup_s": round(self.warmup_s or 0.0, 3),
+            "warmup_rtf": round((self.warmup_s or 0.0) / max(WHISPER_WARMUP_SECONDS, 0.1), 3),
+        }, self.timings_path or "")
+
+    def warmup(self) -> None:
+        """One throwaway inference so the first real command doesn't pay allocation/first-run cost."""
+        import numpy as np
+
+        audio = np.zeros(int(WHISPER_RATE * max(WHISPER_WARMUP_SECONDS, 0.1)), dtype=np.float32)
+        t0 = time.monotonic()
+        # vad off so the decoder really runs; segments are lazy, so drain them
+        segments, _ = self.model.transcribe(audio, language="en", beam_size=1, vad_filter=False)
+        for _ in segments:
+            pass
+        self.warmup_s = time.monotonic() - t0
+
+    def transcribe_detail(self, audio: Union[str, BinaryIO, Any], initial_prompt: Optional[str] = None) -> Transcript:
+        """audio: float32 16 kHz mono array (preferred), or a path / file object for faster-whisper to decode."""
+        if self.model is None:
+            self.load()
+
+        t0 = time.monotonic()
+        # faster-whisper returns segments generator + info
+        segments, info = self.model.transcribe(
+            audio,
+            language="en",
+            vad_filter=True,
+            beam_size=1,
+            initial_prompt=initial_prompt,
+        )
+        text_parts: List[str] = []
+        logprobs: List[float] = []
+        no_speech = 0.0
+        for seg in segments:
+            if seg.text:
+                text_parts.append(seg.text.strip())
+            logprobs.append(seg.avg_logprob)
+            no_speech = max(no_speech, seg.no_speech_prob)
+        return Transcript(
+            text=" ".join(text_parts).strip(),
+            avg_logprob=sum(logprobs) / len(logprobs) if logprobs else 0.0,
+            no_speech_prob=no_speech,
+            seconds=time.monotonic() - t0,
+            tier=self.model_name,
+        )
+
+    def transcribe(self, audio: Union[str, BinaryIO, Any]) -> str:
+        return self.transcribe_detail(audio).text
+
+    def transcribe_pcm(self, pcm: bytes, rate: int = WHISPER_RATE, nchan: int = 1) -> str:
+        return self.transcribe(pcm_to_audio(pcm, rate, nchan))
+
+    def transcribe_wav(self, path: str) -> str:
+        """Read a 16-bit WAV into memory and transcribe it; other formats go through faster-whisper's decoder."""
+        wav = read_wav_pcm(path)
+        if wav is None:
+            return self.transcribe(path)
+        return self.transcribe_pcm(*wav)
+
+
+class TwoTierRecognizer:
+    """
+    Fast tier: a small model prompted with the command phrases and popular artists.
+    Its answer is used when it is confident and accept(text) agrees (e.g. the text
+    parses to a control intent); otherwise the same audio goes to the full model.
+    """
+
+    def __init__(
+        self,
+        full: WhisperTranscriber,
+        fast: Optional[WhisperTranscriber] = None,
+        min_logprob: float = WHISPER_FAST_MIN_LOGPROB,
+        max_no_speech: float = WHISPER_FAST_MAX_NO_SPEECH,
+    ) -> None:
+        self.full = full
+        self.fast = fast
+        self.min_logprob = min_logprob
+        self.max_no_speech = max_no_speech
+        self.prompt: Optional[str] = None
+
+    def load(self) -> None:
+        if self.fast is not None:
+            self.fast.load()
+        self.full.load()
+
+    def set_vocabulary(self, phrases: Sequence[str], artists: Sequence[str] = ()) -> None:
+        """Build the initial_prompt from command phrases, then as many artists as fit the prompt budget."""
+        prompt = ", ".join(phrases) + "."
+        names: List[str] = []
+        budget = PROMPT_MAX_CHARS - len(prompt) - len(" Artists: .")
+        for a in artists:
+            if budget - len(a) - 2 < 0:
+                break
+            names.append(a)
+            budget -= len(a) + 2
+        if names:
+            prompt += " Artists: " + ", ".join(names) + "."
+        self.prompt = prompt  # plain rebinding, safe to swap while another thread transcribes
+
+    def confident(self, t: Transcript) -> bool:
+        return bool(t.text) and t.avg_logprob >= self.min_logprob and t.no_speech_prob <= self.max_no_speech
+
+    def transcribe_audio(self, audio: Any, accept: Optional[Callable[[str], bool]] = None) -> Transcript:
+        prompt = self.prompt
+        reason = ""
+        if self.fast is not None:
+            t = self.fast.transcribe_detail(audio, prompt)
+            t.tier = "fast"
+            if not self.confident(t):
+                reason = f"low confidence ({t.avg_logprob:.2f}/{t.no_speech_prob:.2f}): {t.text!r}"
+            elif accept is not None and not accept(t.text):
+                reason = f"needs full model: {t.text!r}"
+            else:
+                return t
+            if hasattr(audio, "seek"):
+                audio.seek(0)
+
+        t = self.full.transcribe_detail(audio, prompt)
+        t.tier = "full"
+        t.escalated = reason
+        return t
+
+    def transcribe_pcm(self, pcm: bytes, rate: int = WHISPER_RATE, nchan: int = 1,
+                       accept: Optional[Callable[[str], bool]] = None) -> Transcript:
+        return self.transcribe_audio(pcm_to_audio(pcm, rate, nchan), accept)
+
+
+def build_recognizer(full_model: str = WHISPER_MODEL, fast_model: str = WHISPER_FAST_MODEL) -> TwoTierRecognizer:
+    fast = WhisperTranscriber(model_name=fast_model) if fast_model and fast_model != full_model else None
+    return TwoTierRecognizer(full=WhisperTranscriber(model_name=full_model), fast=fast)
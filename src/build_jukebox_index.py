@@ -1,164 +1,175 @@
 #!/usr/bin/env python3
 import os
 import json
+import contextlib
 import time
 import argparse
-from mutagen import File as MutagenFile
 
-from config import MUSIC_ROOT, INDEX_JSON_PATH
+from config import MUSIC_ROOT, INDEX_JSON_PATH, INDEX_NDJSON_PATH
+from library_index import is_audio, is_playlists_path, read_tags
 
-AUDIO_EXTS = {".flac", ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".wav", ".aiff", ".alac"}
-
-def pick_first(tag):
-    if tag is None:
-        return None
-    if isinstance(tag, list):
-        return str(tag[0]) if tag else None
-    return str(tag)
-
-def norm(s):
-    return " ".join(str(s).strip().split()) if s else None
-
-def parse_year_from_value(v):
-    if not v:
-        return None
-    v = str(v).strip()
-    if len(v) < 4:
-        return None
-    head = v[:4]
+def read_track(path: str):
+    """One index record: the shared tag rules from library_index plus the path."""
     try:
-        y = int(head)
-        if 1000 <= y <= 3000:
-            return y
+        meta = read_tags(path)
     except Exception:
         return None
-    return None
-
-def parse_year(tags: dict):
-    # Priority: originaldate/originalyear over date/year
-    for key in ("originaldate", "originalyear", "date", "year"):
-        v = pick_first(tags.get(key))
-        y = parse_year_from_value(v)
-        if y is not None:
-            return y
-    return None
-
-def read_tags(path: str):
+    if not meta:
+        return None
+    return {"path": path, **meta}
+
+def scan_audio_files(top: str = MUSIC_ROOT):
+    """
+    Yield (path, size, mtime) for audio files under `top`, one stat per file.
+    Entries are visited in name order at every level, so paths come out sorted by
+    path_key(); the NDJSON index is written in that order and --update merges against it.
+    """
     try:
-        m = MutagenFile(path, easy=True)
-        if not m:
-            return None
-        tags = dict(m.tags or {})
-        info = m.info
-        duration = float(getattr(info, "length", 0.0) or 0.0)
-
-        artist = norm(pick_first(tags.get("artist")))
-        album = norm(pick_first(tags.get("album")))
-        title = norm(pick_first(tags.get("title")))
-        year = parse_year(tags)
-
-        if not title:
-            base = os.path.basename(path)
-            title = os.path.splitext(base)[0]
-
-        return {
-            "path": path,
-            "artist": artist,
-            "album": album,
-            "title": title,
-            "year": year,
-            "duration": duration,
-        }
-    except Exception:
+        with os.scandir(top) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for e in entries:
+        try:
+            if e.is_dir(follow_symlinks=False):
+                if e.name != "Playlists" and not is_playlists_path(e.path):
+                    yield from scan_audio_files(e.path)
+                continue
+            if not is_audio(e.name):
+                continue
+            st = e.stat()
+        except OSError:
+            continue
+        yield e.path, st.st_size, int(st.st_mtime)
+
+def path_key(path: str):
+    return path.split(os.sep)
+
+def iter_index(path: str = INDEX_NDJSON_PATH):
+    """Lazily yield track records from an NDJSON index (the header line and bad lines are skipped)."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                t = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(t, dict) and t.get("path"):
+                yield t
+
+class ExistingIndex:
+    """
+    Merge-join cursor over the previous index. lookup() must be called with paths in
+    scan order; only one old record is held in memory at a time.
+    """
+
+    def __init__(self, records):
+        self._it = iter(records)
+        self._cur = next(self._it, None)
+
+    def lookup(self, path: str):
+        key = path_key(path)
+        # old records that sort before this path were deleted from disk: drop them
+        while self._cur is not None and path_key(self._cur["path"]) < key:
+            self._cur = next(self._it, None)
+        if self._cur is not None and self._cur["path"] == path:
+            t = self._cur
+            self._cur = next(self._it, None)
+            return t
         return None
 
-def scan_audio_files():
-    for dirpath, _, filenames in os.walk(MUSIC_ROOT):
-        for fn in filenames:
-            ext = os.path.splitext(fn)[1].lower()
-            if ext in AUDIO_EXTS:
-                yield os.path.join(dirpath, fn)
+class JsonTracksWriter:
+    """Streams the legacy {"...", "tracks": [...]} document one track at a time."""
 
-def file_sig(path: str):
-    try:
-        st = os.stat(path)
-        return (st.st_size, int(st.st_mtime))
-    except Exception:
-        return None
+    def __init__(self, f, header: dict):
+        self.f = f
+        self.first = True
+        head = json.dumps(header, ensure_ascii=False)
+        f.write(head[:-1] + (', ' if header else '') + '"tracks": [\n')
 
-def load_existing_index():
-    if not os.path.exists(INDEX_JSON_PATH):
-        return {}
-    try:
-        with open(INDEX_JSON_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        tracks = data.get("tracks", [])
-        # map: path -> (track, sig)
-        m = {}
-        for t in tracks:
-            p = t.get("path")
-            if not p:
-                continue
-            sig = file_sig(p)
-            m[p] = (t, sig)
-        return m
-    except Exception:
-        return {}
+    def write(self, t: dict):
+        if not self.first:
+            self.f.write(",\n")
+        self.first = False
+        self.f.write(json.dumps(t, ensure_ascii=False))
+
+    def close(self):
+        self.f.write("\n]}\n")
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--update", action="store_true", help="Incremental update (only rescan changed/new files)")
+    ap.add_argument("--no-json", dest="json", action="store_false",
+                    help=f"Skip the legacy JSON document ({INDEX_JSON_PATH}); write only the NDJSON index")
     args = ap.parse_args()
 
     t0 = time.time()
-    tracks = []
     seen = 0
+    indexed = 0
+
+    header = {
+        "music_root": MUSIC_ROOT,
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "mode": "update" if args.update else "full",
+    }
 
-    existing = load_existing_index() if args.update else {}
-    existing_paths = set(existing.keys())
+    if args.update and not os.path.exists(INDEX_NDJSON_PATH):
+        print(f"No existing index at {INDEX_NDJSON_PATH}; doing a full scan")
+    existing = ExistingIndex(iter_index() if args.update else ())
 
     kept = 0
     changed = 0
     new = 0
 
-    for full in scan_audio_files():
-        seen += 1
-        sig = file_sig(full)
-
-        if args.update and full in existing:
-            old_track, old_sig = existing[full]
-            if old_sig == sig and old_track:
-                tracks.append(old_track)
+    # Write to temp files and swap in at the end, so a reader never sees a half-written index
+    # (and --update can keep reading the old one while the new one is written).
+    tmp = INDEX_NDJSON_PATH + ".tmp"
+    json_tmp = INDEX_JSON_PATH + ".tmp"
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open(tmp, "w", encoding="utf-8"))
+        out.write(json.dumps(header, ensure_ascii=False) + "\n")
+        legacy = None
+        if args.json:
+            legacy = JsonTracksWriter(stack.enter_context(open(json_tmp, "w", encoding="utf-8")), header)
+
+        for full, size, mtime in scan_audio_files():
+            seen += 1
+            old_track = existing.lookup(full) if args.update else None
+
+            if old_track and old_track.get("size") == size and old_track.get("mtime") == mtime:
+                track = old_track
                 kept += 1
             else:
-                meta = read_tags(full)
-                if meta:
-                    tracks.append(meta)
+                track = read_track(full)
+                if not track:
+                    continue
+                track["size"] = size
+                track["mtime"] = mtime
+                if old_track:
                     changed += 1
-        else:
-            meta = read_tags(full)
-            if meta:
-                tracks.append(meta)
-                new += 1
+                else:
+                    new += 1
 
-        if seen % 5000 == 0:
-            print(f"Scanned {seen} audio files... indexed {len(tracks)} tracks")
+            out.write(json.dumps(track, ensure_ascii=False) + "\n")
+            if legacy:
+                legacy.write(track)
+            indexed += 1
 
-    # Removed files (present in old index, missing now) automatically drop out because we only add scanned files.
+            if seen % 5000 == 0:
+                print(f"Scanned {seen} audio files... indexed {indexed} tracks")
 
-    data = {
-        "music_root": MUSIC_ROOT,
-        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "mode": "update" if args.update else "full",
-        "tracks": tracks,
-    }
+        if legacy:
+            legacy.close()
 
-    with open(INDEX_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Removed files (present in old index, missing now) drop out because only scanned files are written.
+    os.replace(tmp, INDEX_NDJSON_PATH)
+    if args.json:
+        os.replace(json_tmp, INDEX_JSON_PATH)
 
     dt = time.time() - t0
-    print(f"\nWrote {INDEX_JSON_PATH}")
-    print(f"Indexed {len(tracks)} tracks in {dt:.1f}s (seen {seen})")
+    print(f"\nWrote {INDEX_NDJSON_PATH}" + (f" and {INDEX_JSON_PATH}" if args.json else ""))
+    print(f"Indexed {indexed} tracks in {dt:.1f}s (seen {seen})")
     if args.update:
         print(f"Kept {kept} unchanged, updated {changed}, added {new}")
 
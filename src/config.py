@@ -5,15 +5,24 @@ import os
 _ENV_MUSIC_ROOT = "JUKEBOX_MUSIC_ROOT"
 _ENV_DB_PATH = "JUKEBOX_DB_PATH"
 _ENV_INDEX_JSON_PATH = "JUKEBOX_INDEX_JSON_PATH"
+_ENV_INDEX_NDJSON_PATH = "JUKEBOX_INDEX_NDJSON_PATH"
 _ENV_ARTISTS_PATH = "JUKEBOX_ARTISTS_PATH"
+_ENV_DB_BACKUP_DIR = "JUKEBOX_DB_BACKUP_DIR"
+_ENV_DB_BACKUPS_KEEP = "JUKEBOX_DB_BACKUPS_KEEP"
 
 # Defaults
 _DEFAULT_MUSIC_ROOT = "/mnt/lossless"
 _DEFAULT_DB_PATH = "/home/dan/jukebox.db"
 _DEFAULT_INDEX_JSON_PATH = "/home/dan/jukebox_index.json"
+_DEFAULT_INDEX_NDJSON_PATH = "/home/dan/jukebox_index.ndjson"
 _DEFAULT_ARTISTS_PATH = "artists.txt"
+_DEFAULT_DB_BACKUP_DIR = "/home/dan/shuffle-player"
+_DEFAULT_DB_BACKUPS_KEEP = "5"  # newest backups kept; 0 keeps all
 
 MUSIC_ROOT = os.environ.get(_ENV_MUSIC_ROOT, _DEFAULT_MUSIC_ROOT)
 DB_PATH = os.environ.get(_ENV_DB_PATH, _DEFAULT_DB_PATH)
 INDEX_JSON_PATH = os.environ.get(_ENV_INDEX_JSON_PATH, _DEFAULT_INDEX_JSON_PATH)
+INDEX_NDJSON_PATH = os.environ.get(_ENV_INDEX_NDJSON_PATH, _DEFAULT_INDEX_NDJSON_PATH)
 ARTISTS_PATH = os.environ.get(_ENV_ARTISTS_PATH, _DEFAULT_ARTISTS_PATH)
+DB_BACKUP_DIR = os.environ.get(_ENV_DB_BACKUP_DIR, _DEFAULT_DB_BACKUP_DIR)
+DB_BACKUPS_KEEP = int(os.environ.get(_ENV_DB_BACKUPS_KEEP, _DEFAULT_DB_BACKUPS_KEEP))
@@ -0,0 +1,256 @@
+"""
+Content-addressed cover-art cache.
+
+Images are stored once under the sha1 of the source picture (embedded art via
+mutagen, else a cover/folder/front image next to the track), shrunk to a
+dashboard-sized JPEG when Pillow is installed. A small JSON index maps each track
+to its embedded picture (singles and compilations keep their own covers), and each
+folder to its cover.jpg-style image; entries carry the file/folder mtime so edited
+tags or a newly added cover.jpg are picked up. Tracks of one album share the same
+embedded picture, so its thumbnail is made once. Files are evicted
+least-recently-used (by mtime, touched on every hit) above a size cap.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image  # type: ignore
+except ImportError:  # originals are cached as-is
+    Image = None
+
+COVER_CACHE_MAX_BYTES = int(os.getenv("JUKEBOX_COVER_CACHE_MB", "64")) * 1024 * 1024
+THUMB_SIZE = 320  # px, longest side; the dashboard shows covers at up to ~300 px
+THUMB_QUALITY = 85
+INDEX_NAME = "index.json"
+
+FOLDER_ART_NAMES = (
+    "cover.jpg",
+    "cover.jpeg",
+    "cover.png",
+    "folder.jpg",
+    "folder.jpeg",
+    "folder.png",
+    "front.jpg",
+    "front.jpeg",
+    "front.png",
+)
+
+FRONT_COVER = 3  # picture type in ID3 APIC / FLAC PICTURE blocks
+
+
+def _ext_for(mime: str) -> str:
+    return ".png" if "png" in (mime or "").lower() else ".jpg"
+
+
+def embedded_picture(path: str) -> Optional[Tuple[bytes, str]]:
+    """(image bytes, extension) of the embedded front cover (or first picture), via mutagen."""
+    from mutagen import File as MutagenFile
+
+    try:
+        m = MutagenFile(path)
+    except Exception:
+        return None
+    if m is None:
+        return None
+
+    pics = []  # (type, data, mime)
+    try:
+        for p in getattr(m, "pictures", None) or []:  # FLAC
+            pics.append((p.type, p.data, p.mime))
+        tags = m.tags
+        if tags is not None:
+            if hasattr(tags, "getall"):  # ID3 (MP3, AIFF, ...)
+                for p in tags.getall("APIC"):
+                    pics.append((p.type, p.data, p.mime))
+            else:
+                for c in tags.get("covr") or []:  # MP4
+                    pics.append((FRONT_COVER, bytes(c), "image/png" if c.imageformat == c.FORMAT_PNG else "image/jpeg"))
+                for b64 in tags.get("metadata_block_picture") or []:  # Ogg Vorbis / Opus
+                    from mutagen.flac import Picture
+                    p = Picture(base64.b64decode(b64))
+                    pics.append((p.type, p.data, p.mime))
+    except Exception:
+        pass
+
+    pics = [p for p in pics if p[1]]
+    if not pics:
+        return None
+    _, data, mime = next((p for p in pics if p[0] == FRONT_COVER), pics[0])
+    return data, _ext_for(mime)
+
+
+def folder_picture(folder: str) -> Optional[Tuple[bytes, str]]:
+    try:
+        names = {n.lower(): n for n in os.listdir(folder)}
+    except OSError:
+        return None
+    for name in FOLDER_ART_NAMES:
+        if name in names:
+            try:
+                with open(os.path.join(folder, names[name]), "rb") as f:
+                    return f.read(), os.path.splitext(name)[1].replace(".jpeg", ".jpg")
+            except OSError:
+                continue
+    return None
+
+
+class CoverCache:
+    def __init__(self, directory: str, max_bytes: int = COVER_CACHE_MAX_BYTES, thumb_size: int = THUMB_SIZE) -> None:
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.thumb_size = thumb_size
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, INDEX_NAME)
+        self._tracks: Dict[str, Dict] = {}   # track path -> {"name": embedded art or "", "mtime"}
+        self._folders: Dict[str, Dict] = {}  # folder -> {"name": folder image or "", "mtime"}
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if isinstance(index.get("tracks"), dict) and isinstance(index.get("folders"), dict):
+                self._tracks, self._folders = index["tracks"], index["folders"]
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    def _entry(self, table: Dict[str, Dict], key: str) -> Optional[str]:
+        """Name from a still-valid index entry ("" = known to have none), else None."""
+        with self._lock:
+            entry = table.get(key)
+        if entry is None or entry.get("mtime") != self._mtime(key):
+            return None
+        name = entry.get("name", "")
+        if name:
+            try:
+                os.utime(os.path.join(self.dir, name))  # LRU touch
+            except OSError:
+                return None  # evicted
+        return name
+
+    def lookup(self, track_path: str) -> Optional[str]:
+        """
+        Cached file name for the track's cover: a name, "" when it is known to have no
+        art, or None when it hasn't been resolved yet. Never extracts.
+        """
+        track_path = os.path.abspath(track_path)
+        name = self._entry(self._tracks, track_path)
+        if name is None or name:
+            return name
+        return self._entry(self._folders, os.path.dirname(track_path))
+
+    def get(self, track_path: str) -> str:
+        """Cached file name for the track's cover (extracting it if needed), or "" when there is none."""
+        name = self.lookup(track_path)
+        if name is None:
+            name = self.resolve(track_path)
+        return name
+
+    def resolve(self, track_path: str) -> str:
+        """Embedded art for this track, else the folder's cover image (read once per folder)."""
+        track_path = os.path.abspath(track_path)
+        os.makedirs(self.dir, exist_ok=True)
+
+        mtime = self._mtime(track_path)
+        pic = embedded_picture(track_path) if os.path.exists(track_path) else None
+        name = self.store(*pic) if pic else ""
+        with self._lock:
+            self._tracks[track_path] = {"name": name, "mtime": mtime}
+            self._save_index()
+        if name:
+            return name
+
+        folder = os.path.dirname(track_path)
+        name = self._entry(self._folders, folder)
+        if name is None:
+            mtime = self._mtime(folder)
+            pic = folder_picture(folder)
+            name = self.store(*pic) if pic else ""
+            with self._lock:
+                self._folders[folder] = {"name": name, "mtime": mtime}
+                self._save_index()
+        return name
+
+    def store(self, data: bytes, ext: str) -> str:
+        """Write one image under its content hash (as a thumbnail when Pillow is available)."""
+        digest = hashlib.sha1(data).hexdigest()[:20]
+        for name in (digest + ".jpg", digest + ext):
+            path = os.path.join(self.dir, name)
+            if os.path.exists(path):
+                os.utime(path)
+                return name
+
+        thumb = self._thumbnail(data)
+        if thumb is not None:
+            data, ext = thumb, ".jpg"
+        name = digest + ext
+        path = os.path.join(self.dir, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._evict()
+        return name
+
+    def _thumbnail(self, data: bytes) -> Optional[bytes]:
+        if Image is None:
+            return None
+        try:
+            im = Image.open(io.BytesIO(data))
+            im.thumbnail((self.thumb_size, self.thumb_size))
+            buf = io.BytesIO()
+            im.convert("RGB").save(buf, "JPEG", quality=THUMB_QUALITY)
+            return buf.getvalue()
+        except Exception:
+            return None
+
+    def _save_index(self) -> None:
+        """Caller holds _lock."""
+        tmp = self._index_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"tracks": self._tracks, "folders": self._folders}, f)
+            os.replace(tmp, self._index_path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        files = []
+        total = 0
+        with os.scandir(self.dir) as it:
+            for e in it:
+                if e.name == INDEX_NAME or e.name.endswith(".tmp") or not e.is_file():
+                    continue
+                st = e.stat()
+                files.append((st.st_mtime, st.st_size, e.name))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+
+        files.sort()
+        removed = set()
+        for _, size, name in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.dir, name))
+            except OSError:
+                continue
+            removed.add(name)
+            total -= size
+
+        with self._lock:
+            for table in (self._tracks, self._folders):
+                for key in [k for k, v in table.items() if v.get("name") in removed]:
+                    del table[key]
+            self._save_index()
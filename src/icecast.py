@@ -0,0 +1,124 @@
+"""
+Icecast admin/status access over one kept-alive HTTP connection.
+
+IcecastHTTP wraps a persistent http.client connection (reopened transparently
+when Icecast closes it). MetadataPusher sends `updinfo` title changes from a
+background thread: callers never block, rapid skips coalesce so only the latest
+title goes out, and failures retry with exponential backoff.
+"""
+
+import base64
+import http.client
+import json
+import threading
+import urllib.parse
+from typing import Any, Dict, Optional, Tuple
+
+ICECAST_HOST = "127.0.0.1"
+ICECAST_PORT = 8001
+ICECAST_USER = "admin"
+ICECAST_PASS = "hackmejudasshuffle"
+ICECAST_MOUNT = "/stream.mp3"
+
+
+class IcecastHTTP:
+    def __init__(self, host: str = ICECAST_HOST, port: int = ICECAST_PORT,
+                 user: Optional[str] = None, password: Optional[str] = None, timeout: float = 3.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._headers = {"Connection": "keep-alive"}
+        if user is not None:
+            token = base64.b64encode(f"{user}:{password or ''}".encode("utf-8")).decode("ascii")
+            self._headers["Authorization"] = f"Basic {token}"
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get(self, path: str, params: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """(status, body). A stale kept-alive connection is retried once on a fresh one."""
+        if params:
+            path = f"{path}?{urllib.parse.urlencode(params)}"
+        with self._lock:
+            for attempt in (1, 2):
+                if self._conn is None:
+                    self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                try:
+                    self._conn.request("GET", path, headers=self._headers)
+                    resp = self._conn.getresponse()
+                    body = resp.read()
+                    if resp.will_close:
+                        self._conn.close()
+                        self._conn = None
+                    return resp.status, body
+                except (http.client.HTTPException, OSError):
+                    self._conn.close()
+                    self._conn = None
+                    if attempt == 2:
+                        raise
+        raise RuntimeError("unreachable")
+
+    def get_json(self, path: str) -> Any:
+        status, body = self.get(path)
+        if status != 200:
+            raise http.client.HTTPException(f"HTTP {status} for {path}")
+        return json.loads(body.decode("utf-8", errors="replace"))
+
+
+class MetadataPusher:
+    def __init__(self, http: Optional[IcecastHTTP] = None, mount: str = ICECAST_MOUNT,
+                 min_backoff: float = 1.0, max_backoff: float = 30.0) -> None:
+        self.http = http or IcecastHTTP(user=ICECAST_USER, password=ICECAST_PASS)
+        self.mount = mount
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.coalesced = 0
+        self.last_error: Optional[str] = None
+        self._pending: Optional[str] = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="icecast-metadata", daemon=True)
+        self._thread.start()
+
+    def push(self, artist: Optional[str], title: Optional[str]) -> None:
+        """Queue "artist - title"; returns immediately. A newer push replaces an unsent one."""
+        if not artist or not title:
+            return
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = f"{artist} - {title}"
+            self._cond.notify()
+
+    def _send(self, song: str) -> None:
+        status, _ = self.http.get("/admin/metadata", {"mode": "updinfo", "mount": self.mount, "song": song})
+        if status != 200:
+            raise http.client.HTTPException(f"HTTP {status}")
+
+    def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                song, self._pending = self._pending, None
+
+            try:
+                self._send(song)
+                self.sent += 1
+                self.last_error = None
+                backoff = self.min_backoff
+            except Exception as e:
+                self.last_error = str(e)
+                with self._cond:
+                    # retry this title unless a newer one arrived meanwhile
+                    if self._pending is None:
+                        self._pending = song
+                    # sleep the backoff, but a new title cuts it short
+                    self._cond.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,979 @@
+#!/usr/bin/env python3
+"""
+Library indexer for jukebox.db.
+
+One walk of MUSIC_ROOT does everything: stat, diff against the tracks table, read
+tags for new/changed files (optionally in a process pool), and delete rows whose
+files are gone. There is one schema (ensure_schema) and one set of tag rules
+(read_tags) shared by every script that touches the library.
+
+CLI:
+    python3 src/library_index.py [--force] [--workers N] [--stat-only] [--no-prune] [--no-backup] [--dir-cache]
+    python3 src/library_index.py --watch [--poll]
+
+Module:
+    from library_index import sync_library
+    stats = sync_library(workers=2, progress=lambda s: print(s.as_dict()))
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import stat
+import struct
+import threading
+import time
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from dataclasses import dataclass, asdict, field
+
+from config import MUSIC_ROOT, DB_PATH, DB_BACKUP_DIR, DB_BACKUPS_KEEP
+
+AUDIO_EXTS = {".flac", ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".wav", ".aiff", ".alac", ".wma"}
+
+def connect(db_path: str = DB_PATH):
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("PRAGMA synchronous=NORMAL;")
+    return con
+
+def ensure_schema(con: sqlite3.Connection):
+    con.executescript("""
+    CREATE TABLE IF NOT EXISTS tracks (
+      path           TEXT PRIMARY KEY,
+      artist         TEXT,
+      artist_sort    TEXT,
+      album          TEXT,
+      title          TEXT,
+      tracknumber    INTEGER,
+      year           INTEGER,
+      duration       REAL,
+      bitrate        INTEGER,
+      samplerate     INTEGER,
+      channels       INTEGER,
+      mtime          INTEGER NOT NULL,
+      size           INTEGER NOT NULL,
+      ext            TEXT,
+      added_at       INTEGER NOT NULL,
+      updated_at     INTEGER NOT NULL,
+      genre          TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_tracks_artist ON tracks(artist);
+    CREATE INDEX IF NOT EXISTS idx_tracks_year   ON tracks(year);
+    CREATE INDEX IF NOT EXISTS idx_tracks_dur    ON tracks(duration);
+
+    CREATE TABLE IF NOT EXISTS scan_state (
+      key   TEXT PRIMARY KEY,
+      value TEXT NOT NULL
+    );
+
+    -- per-directory snapshot from the last full scan; lets unchanged album folders be skipped
+    CREATE TABLE IF NOT EXISTS dirs (
+      path        TEXT PRIMARY KEY,
+      mtime       INTEGER NOT NULL,
+      file_count  INTEGER NOT NULL
+    );
+    """)
+    # Existing DBs: add genre column if missing (CREATE TABLE IF NOT EXISTS won't alter existing table)
+    try:
+        con.execute("ALTER TABLE tracks ADD COLUMN genre TEXT")
+    except sqlite3.OperationalError as e:
+        if "duplicate column" not in str(e).lower():
+            raise
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tracks_genre ON tracks(genre)")
+
+def is_playlists_path(p: str) -> bool:
+    s = p.replace("\\", "/")
+    return "/Playlists/" in s or s.endswith("/Playlists") or s.startswith(f"{MUSIC_ROOT}/Playlists/")
+
+def is_audio(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in AUDIO_EXTS
+
+# ----------------------------
+# Tag rules
+# ----------------------------
+
+def pick_first(tag):
+    if tag is None:
+        return None
+    if isinstance(tag, list):
+        return str(tag[0]) if tag else None
+    return str(tag)
+
+def norm(s):
+    return " ".join(str(s).strip().split()) if s else None
+
+def parse_year_from_value(v):
+    if not v:
+        return None
+    v = str(v).strip()
+    if len(v) < 4:
+        return None
+    try:
+        y = int(v[:4])
+        if 1000 <= y <= 3000:
+            return y
+    except Exception:
+        return None
+    return None
+
+def parse_year(tags):
+    # Priority: originaldate/originalyear over date/year, so remasters file under their original decade
+    for key in ("originaldate", "originalyear", "date", "year"):
+        y = parse_year_from_value(pick_first(tags.get(key)))
+        if y is not None:
+            return y
+    return None
+
+def read_tags(path: str):
+    """Tags + stream info for one file, or None if mutagen can't parse it. May raise on I/O errors."""
+    from mutagen import File as MutagenFile
+
+    m = MutagenFile(path, easy=True)
+    if not m:
+        return None
+    tags = m.tags or {}
+    info = getattr(m, "info", None)
+
+    artist = norm(pick_first(tags.get("artist") or tags.get("albumartist")))
+    album  = norm(pick_first(tags.get("album")))
+    title  = norm(pick_first(tags.get("title"))) or os.path.splitext(os.path.basename(path))[0]
+
+    tn_raw = pick_first(tags.get("tracknumber"))
+    tracknumber = None
+    if tn_raw:
+        try:
+            tracknumber = int(str(tn_raw).split("/")[0])
+        except Exception:
+            tracknumber = None
+
+    genre_raw = tags.get("genre") or tags.get("genres")
+    if genre_raw is not None and isinstance(genre_raw, list) and genre_raw:
+        genre = norm(str(genre_raw[0]))
+    elif genre_raw is not None:
+        genre = norm(str(genre_raw))
+    else:
+        genre = None
+
+    duration = None
+    bitrate = samplerate = channels = None
+    if info:
+        length = getattr(info, "length", None)
+        duration = float(length) if length else None
+        br = getattr(info, "bitrate", None)
+        bitrate = int(br) if br else None
+        sr = getattr(info, "sample_rate", None)
+        samplerate = int(sr) if sr else None
+        ch = getattr(info, "channels", None)
+        channels = int(ch) if ch else None
+
+    return {
+        "artist": artist,
+        "album": album,
+        "title": title,
+        "tracknumber": tracknumber,
+        "year": parse_year(tags),
+        "genre": genre,
+        "duration": duration,
+        "bitrate": bitrate,
+        "samplerate": samplerate,
+        "channels": channels,
+    }
+
+EMPTY_META = {"artist": None, "album": None, "title": None, "tracknumber": None,
+              "year": None, "genre": None, "duration": None, "bitrate": None, "samplerate": None, "channels": None}
+
+UPSERT_SQL = """
+  INSERT INTO tracks(path,artist,album,title,tracknumber,year,genre,duration,bitrate,samplerate,channels,
+                     mtime,size,ext,added_at,updated_at)
+  VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+  ON CONFLICT(path) DO UPDATE SET
+    artist=excluded.artist,
+    album=excluded.album,
+    title=excluded.title,
+    tracknumber=excluded.tracknumber,
+    year=excluded.year,
+    genre=excluded.genre,
+    duration=excluded.duration,
+    bitrate=excluded.bitrate,
+    samplerate=excluded.samplerate,
+    channels=excluded.channels,
+    mtime=excluded.mtime,
+    size=excluded.size,
+    ext=excluded.ext,
+    updated_at=excluded.updated_at
+"""
+
+# --stat-only: record mtime/size without reading tags (e.g. right after a JSON migration)
+STAT_UPSERT_SQL = """
+  INSERT INTO tracks(path, mtime, size, ext, added_at, updated_at)
+  VALUES(?,?,?,?,?,?)
+  ON CONFLICT(path) DO UPDATE SET
+    mtime=excluded.mtime,
+    size=excluded.size,
+    ext=excluded.ext,
+    updated_at=excluded.updated_at
+"""
+
+# meta returned by tag_job when reading the file raised (as opposed to None: no usable tags)
+TAG_FAILED = "failed"
+
+def tag_job(item):
+    """Worker-side: read tags for one (path, mtime, size, ext, added_at) item."""
+    path = item[0]
+    try:
+        meta = read_tags(path)
+    except Exception:
+        # e.g. a file still being copied: don't record it, so the next scan retries
+        meta = TAG_FAILED
+    return item, meta
+
+def iter_tagged(items, workers, mp_context=None):
+    """Yield (item, meta) for each item, reading tags inline or in a process pool."""
+    if workers == 1:
+        for item in items:
+            yield tag_job(item)
+        return
+
+    # Keep a bounded number of files in flight so the walker can't run far ahead of the pool.
+    max_inflight = workers * 16
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+        pending = set()
+        for item in items:
+            pending.add(pool.submit(tag_job, item))
+            if len(pending) >= max_inflight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+        for fut in as_completed(pending):
+            yield fut.result()
+
+# ----------------------------
+# Writer
+# ----------------------------
+
+# Rows per executemany() call, and rows per transaction. A first import of a large library
+# becomes a handful of big transactions instead of thousands of small commits.
+BATCH_ROWS = 1000
+TXN_ROWS = 50000
+
+class RowWriter(threading.Thread):
+    """Single SQLite writer: buffers tag results and flushes them with executemany in large transactions."""
+
+    def __init__(self, now: int, db_path: str = DB_PATH, batch_rows: int = BATCH_ROWS, txn_rows: int = TXN_ROWS,
+                 state_key: str = "last_scan_at", stat_only: bool = False):
+        super().__init__(name="sqlite-writer", daemon=True)
+        self.now = now
+        self.db_path = db_path
+        self.state_key = state_key
+        self.stat_only = stat_only
+        self.batch_rows = batch_rows
+        self.txn_rows = txn_rows
+        self.q = queue.Queue(maxsize=batch_rows * 4)
+        self.inserted = 0
+        self.changed = 0
+        self.removed = 0
+        self.busy = 0.0  # seconds spent inside SQLite calls
+        self.error = None
+        # set before close(): replaces the dirs table in the same transaction as the last rows,
+        # so a directory is never recorded as scanned before its tracks are committed
+        self.dirs_snapshot = None
+        # set before close(): paths to delete, applied in that same final transaction
+        self.deletes = ()
+
+    def put(self, result):
+        self.q.put(result)
+
+    def close(self):
+        self.q.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def _row(self, item, meta):
+        path, mtime, size, ext, added_at = item
+        added_at = self.now if added_at is None else added_at
+        if self.stat_only:
+            return (path, mtime, size, ext, added_at, self.now)
+        if meta is None:
+            meta = EMPTY_META
+        return (
+            path,
+            meta["artist"], meta["album"], meta["title"], meta["tracknumber"], meta["year"], meta["genre"],
+            meta["duration"], meta["bitrate"], meta["samplerate"], meta["channels"],
+            mtime, size, ext,
+            added_at,
+            self.now
+        )
+
+    def run(self):
+        try:
+            con = connect(self.db_path)
+            con.execute("PRAGMA temp_store=MEMORY;")
+            con.execute("PRAGMA cache_size=-32000;")  # ~32 MB page cache for the bulk load
+            sql = STAT_UPSERT_SQL if self.stat_only else UPSERT_SQL
+            rows = []
+            in_txn = 0
+
+            while True:
+                result = self.q.get()
+                if result is None:
+                    break
+                item, meta = result
+                rows.append(self._row(item, meta))
+
+                if item[4] is None:
+                    self.inserted += 1
+                else:
+                    self.changed += 1
+
+                if len(rows) >= self.batch_rows:
+                    t = time.time()
+                    con.executemany(sql, rows)
+                    in_txn += len(rows)
+                    rows.clear()
+                    if in_txn >= self.txn_rows:
+                        con.commit()
+                        in_txn = 0
+                    self.busy += time.time() - t
+
+            t = time.time()
+            if rows:
+                con.executemany(sql, rows)
+            if self.deletes:
+                con.executemany("DELETE FROM tracks WHERE path=?", ((p,) for p in self.deletes))
+                self.removed = len(self.deletes)
+            if self.dirs_snapshot is not None:
+                con.execute("DELETE FROM dirs")
+                con.executemany("INSERT INTO dirs(path, mtime, file_count) VALUES(?,?,?)", self.dirs_snapshot)
+            con.execute("INSERT OR REPLACE INTO scan_state(key,value) VALUES(?,?)", (self.state_key, str(self.now)))
+            con.commit()
+            con.close()
+            self.busy += time.time() - t
+        except Exception as e:
+            self.error = e
+            # keep draining so producers never block on a dead writer
+            while self.q.get() is not None:
+                pass
+
+# ----------------------------
+# Full scan
+# ----------------------------
+
+@dataclass
+class ScanStats:
+    scanned: int = 0
+    skipped: int = 0
+    tagged: int = 0
+    failed: int = 0
+    inserted: int = 0
+    changed: int = 0
+    removed: int = 0
+    dirs: int = 0
+    dirs_skipped: int = 0
+    elapsed: float = 0.0
+    done: bool = False
+    # wall-clock seconds per phase; walk and tags overlap with write (the writer is its own thread)
+    phases: dict = field(default_factory=dict)
+
+    @property
+    def files_per_sec(self) -> float:
+        return self.scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tagged_per_sec(self) -> float:
+        return self.tagged / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        d = asdict(self)
+        d["files_per_sec"] = round(self.files_per_sec, 1)
+        d["tagged_per_sec"] = round(self.tagged_per_sec, 1)
+        return d
+
+    def summary(self) -> str:
+        return (f"Scanned: {self.scanned} | Inserted: {self.inserted} | Changed: {self.changed} | "
+                f"Removed: {self.removed} | Skipped: {self.skipped} | Failed: {self.failed} | "
+                f"Unchanged dirs: {self.dirs_skipped}/{self.dirs} | "
+                f"{self.files_per_sec:.0f} files/s, {self.tagged_per_sec:.1f} tagged/s in {self.elapsed:.1f}s\n"
+                "Phases: " + " | ".join(f"{k} {v:.2f}s" for k, v in self.phases.items()))
+
+def load_dir_cache(con: sqlite3.Connection):
+    return {path: (int(mtime), int(n)) for path, mtime, n in con.execute("SELECT path, mtime, file_count FROM dirs")}
+
+def walk_library(root, existing, force, stats, seen_paths, seen_dirs, failed_dirs, dir_cache=None, on_dir=None):
+    """
+    Walk `root` and yield (path, mtime, size, ext, added_at) for files needing a (re)write.
+
+    Every audio path found on disk is added to seen_paths (for delete detection) and every
+    directory to seen_dirs as (path, mtime_ns, audio count); directories that could not be
+    listed go to failed_dirs so nothing below them is treated as deleted.
+
+    With a dir_cache (path -> (mtime_ns, audio count) from the last scan), a directory whose
+    mtime and audio file count are unchanged and whose files are all in the DB is skipped
+    without stat'ing its files.
+
+    on_dir, if given, is called before each directory, so callers can report progress
+    even when nothing needs a write.
+    """
+    def onerror(e):
+        failed_dirs.append(getattr(e, "filename", None) or root)
+
+    for dirpath, dirs, files in os.walk(root, onerror=onerror):
+        if on_dir:
+            on_dir()
+        # prune Playlists from traversal
+        dirs[:] = [d for d in dirs if d != "Playlists"]
+        if is_playlists_path(dirpath):
+            continue
+
+        audio = [os.path.join(dirpath, fn) for fn in files if is_audio(fn)]
+        seen_paths.update(audio)
+        stats.dirs += 1
+        try:
+            dir_mtime = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+        if dir_mtime is not None:
+            seen_dirs.append((dirpath, dir_mtime, len(audio)))
+
+        if (not force and dir_cache is not None and dir_mtime is not None
+                and dir_cache.get(dirpath) == (dir_mtime, len(audio))
+                and all(p in existing for p in audio)):
+            stats.scanned += len(audio)
+            stats.skipped += len(audio)
+            stats.dirs_skipped += 1
+            continue
+
+        for path in audio:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                seen_paths.discard(path)
+                continue
+            except OSError:
+                # e.g. transient NAS issue: keep the row, retry next scan
+                continue
+
+            mtime = int(st.st_mtime)
+            size  = int(st.st_size)
+
+            stats.scanned += 1
+
+            prev = existing.get(path)
+            if not force and prev and prev[0] == mtime and prev[1] == size and prev[0] != 0:
+                stats.skipped += 1
+                continue
+
+            # existing rows keep their original added_at; new rows get None and are stamped by the writer
+            yield (path, mtime, size, os.path.splitext(path)[1].lower(), prev[2] if prev else None)
+
+def find_missing(existing, seen_paths, failed_dirs):
+    """DB paths not seen on disk, excluding anything below a directory that failed to list."""
+    prefixes = tuple(d.rstrip("/") + "/" for d in failed_dirs)
+    return [p for p in existing if p not in seen_paths and not (prefixes and p.startswith(prefixes))]
+
+def backup_db(db_path: str = DB_PATH, backup_dir: str = DB_BACKUP_DIR, keep: int = DB_BACKUPS_KEEP) -> str:
+    """
+    Consistent copy of the DB as <backup_dir>/<name>.backup.<timestamp>; returns its path.
+    Only the newest `keep` backups of this DB are kept (0 keeps all).
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    prefix = f"{os.path.basename(db_path)}.backup."
+    dest = os.path.join(backup_dir, prefix + time.strftime('%Y%m%d_%H%M%S'))
+    src = sqlite3.connect(db_path)
+    try:
+        dst = sqlite3.connect(dest)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+    if keep > 0:
+        # timestamps sort by name, oldest first
+        old = sorted(n for n in os.listdir(backup_dir) if n.startswith(prefix))[:-keep]
+        for name in old:
+            try:
+                os.remove(os.path.join(backup_dir, name))
+            except OSError:
+                pass
+    return dest
+
+def sync_library(force: bool = False, workers: int = 1, use_dir_cache: bool = False, stat_only: bool = False,
+                 prune: bool = True, progress=None, progress_interval: float = 1.0,
+                 root: str = MUSIC_ROOT, db_path: str = DB_PATH, mp_context=None,
+                 backup_dir: str = None) -> ScanStats:
+    """
+    Bring jukebox.db in line with the files under `root` in a single walk.
+
+    progress, if given, is called with the live ScanStats roughly every progress_interval
+    seconds and once more at the end (stats.done is True then).
+
+    With prune and a backup_dir, the DB is copied there first (see backup_db), since
+    a flaky mount can make files look deleted.
+
+    use_dir_cache skips folders whose mtime and file count are unchanged since the last
+    scan. It is off by default: tags rewritten in place don't touch the folder's mtime,
+    so those files would never be re-read.
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Music root not found: {root}")
+
+    if prune and backup_dir and os.path.exists(db_path):
+        print(f"Backup created: {backup_db(db_path, backup_dir)}", flush=True)
+
+    con = connect(db_path)
+    ensure_schema(con)
+
+    now = int(time.time())
+    t0 = time.time()
+    stats = ScanStats()
+    phases = stats.phases
+
+    # The DB path set is loaded once and diffed against the on-disk set the walk builds:
+    # additions are on-disk paths missing here, deletions are DB paths the walk never saw.
+    existing = {}
+    for path, mtime, size, added_at in con.execute("SELECT path, mtime, size, added_at FROM tracks"):
+        existing[path] = (int(mtime), int(size), int(added_at))
+    dir_cache = load_dir_cache(con) if use_dir_cache else None
+    con.close()
+    phases["load"] = time.time() - t0
+
+    seen_paths = set()
+    seen_dirs = []
+    failed_dirs = []
+
+    writer = RowWriter(now, db_path=db_path, stat_only=stat_only)
+    writer.start()
+
+    last_report = t0
+
+    def report():
+        stats.elapsed = time.time() - t0
+        stats.inserted = writer.inserted
+        stats.changed = writer.changed
+        if progress:
+            progress(stats)
+
+    def maybe_report():
+        nonlocal last_report
+        if time.time() - last_report >= progress_interval:
+            last_report = time.time()
+            report()
+
+    def timed_walk():
+        # time spent inside the walker (listing + stat), as opposed to waiting on tag reads
+        # reporting from the walk too: an incremental scan may have almost nothing to tag
+        it = walk_library(root, existing, force, stats, seen_paths, seen_dirs, failed_dirs, dir_cache,
+                          on_dir=maybe_report if progress else None)
+        phases["walk"] = 0.0
+        while True:
+            t = time.time()
+            item = next(it, None)
+            phases["walk"] += time.time() - t
+            if item is None:
+                return
+            yield item
+
+    t_scan = time.time()
+    items = timed_walk()
+    results = ((item, None) for item in items) if stat_only else iter_tagged(items, workers, mp_context)
+    retry_dirs = set()
+    for result in results:
+        item, meta = result
+        if meta == TAG_FAILED:
+            # keep the old row (and its mtime) so the file is read again next scan
+            stats.failed += 1
+            retry_dirs.add(os.path.dirname(item[0]))
+        else:
+            writer.put(result)
+            if not stat_only:
+                stats.tagged += 1
+        maybe_report()
+    phases["tags"] = max(0.0, time.time() - t_scan - phases["walk"])
+
+    t = time.time()
+    missing = find_missing(existing, seen_paths, failed_dirs) if prune else []
+    looks_unmounted = existing and not seen_paths
+    if missing and looks_unmounted:
+        # An unmounted NAS looks exactly like an empty library; never wipe the DB because of it.
+        print(f"Nothing found under {root}; not removing {len(missing)} rows (is the library mounted?)", flush=True)
+        missing = []
+
+    phases["diff"] = time.time() - t
+
+    writer.deletes = missing
+    # folders with unreadable files stay out of the dir cache, or they'd be skipped next time
+    writer.dirs_snapshot = ([d for d in seen_dirs if d[0] not in retry_dirs]
+                            if not (failed_dirs or looks_unmounted) else None)
+    t = time.time()
+    writer.close()
+    phases["commit"] = time.time() - t
+    phases["write"] = writer.busy
+
+    stats.removed = writer.removed
+    stats.done = True
+    report()
+    return stats
+
+# ----------------------------
+# Watch mode: apply only changed paths
+# ----------------------------
+
+def sync_paths(dirty, workers: int, db_path: str = DB_PATH):
+    """
+    Bring the tracks table in line with a set of paths reported as changed.
+    Paths that still exist are stat'ed (directories are walked) and re-tagged if
+    mtime/size differ; paths that vanished are deleted, including any rows below them.
+    """
+    now = int(time.time())
+    con = connect(db_path)
+    items = {}
+    gone = []
+
+    def consider(path, st):
+        if not is_audio(path) or is_playlists_path(path):
+            return
+        mtime = int(st.st_mtime)
+        size = int(st.st_size)
+        prev = con.execute("SELECT mtime, size, added_at FROM tracks WHERE path=?", (path,)).fetchone()
+        if prev and int(prev[0]) == mtime and int(prev[1]) == size and int(prev[0]) != 0:
+            return
+        items[path] = (path, mtime, size, os.path.splitext(path)[1].lower(), int(prev[2]) if prev else None)
+
+    for p in sorted(dirty):
+        if is_playlists_path(p):
+            continue
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            gone.append(p)
+            continue
+        except OSError:
+            continue
+
+        if not stat.S_ISDIR(st.st_mode):
+            consider(p, st)
+            continue
+
+        for root, dirs, files in os.walk(p):
+            dirs[:] = [d for d in dirs if d != "Playlists"]
+            for fn in files:
+                path = os.path.join(root, fn)
+                try:
+                    consider(path, os.stat(path))
+                except OSError:
+                    continue
+
+    removed = 0
+    for p in gone:
+        # '/' < '0', so (p + "/", p + "0") brackets everything below p (and uses the primary key)
+        top = p.rstrip("/")
+        cur = con.execute("DELETE FROM tracks WHERE path=? OR (path > ? AND path < ?)", (top, top + "/", top + "0"))
+        removed += cur.rowcount
+    con.commit()
+    con.close()
+
+    writer = RowWriter(now, db_path=db_path, state_key="last_watch_at")
+    writer.start()
+    failed = 0
+    for result in iter_tagged(list(items.values()), min(workers, max(1, len(items)))):
+        if result[1] == TAG_FAILED:
+            failed += 1
+            continue
+        writer.put(result)
+    writer.close()
+
+    if writer.inserted or writer.changed or removed or failed:
+        print(f"Watch: Inserted: {writer.inserted} | Changed: {writer.changed} | Removed: {removed} | "
+              f"Failed: {failed}", flush=True)
+
+class InotifyWatcher:
+    """Recursive inotify watch on MUSIC_ROOT (via libc). Raises OSError if inotify can't cover the tree."""
+
+    IN_ATTRIB      = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM  = 0x00000040
+    IN_MOVED_TO    = 0x00000080
+    IN_CREATE      = 0x00000100
+    IN_DELETE      = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW  = 0x00004000
+    IN_IGNORED     = 0x00008000
+    IN_ONLYDIR     = 0x01000000
+    IN_ISDIR       = 0x40000000
+
+    MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+            IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: str):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+        self.wds = {}  # wd -> directory path
+        try:
+            self._add_tree(root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add_watch(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        self.wds[wd] = path
+
+    def _add_tree(self, top: str):
+        for root, dirs, _ in os.walk(top):
+            dirs[:] = [d for d in dirs if d != "Playlists"]
+            if is_playlists_path(root):
+                continue
+            self._add_watch(root)
+
+    def _forget_tree(self, top: str):
+        prefix = top.rstrip("/") + "/"
+        for wd, path in list(self.wds.items()):
+            if path == top or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                self.wds.pop(wd, None)
+
+    def _read(self, dirty) -> bool:
+        """Drain pending events into `dirty`. Returns True if the kernel queue overflowed."""
+        overflow = False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        off = 0
+        while off + self._EVENT.size <= len(data):
+            wd, mask, _cookie, nlen = self._EVENT.unpack_from(data, off)
+            off += self._EVENT.size
+            name = data[off:off + nlen].split(b"\0", 1)[0]
+            off += nlen
+
+            if mask & self.IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & self.IN_IGNORED:
+                self.wds.pop(wd, None)
+                continue
+
+            base = self.wds.get(wd)
+            if base is None:
+                continue
+            if not name:
+                if mask & self.IN_DELETE_SELF:
+                    dirty.add(base)
+                continue
+
+            full = os.path.join(base, os.fsdecode(name))
+            if is_playlists_path(full):
+                continue
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    try:
+                        self._add_tree(full)
+                    except OSError as e:
+                        print(f"Watch: {e}", flush=True)
+                elif mask & self.IN_MOVED_FROM:
+                    self._forget_tree(full)
+                dirty.add(full)
+            elif is_audio(full):
+                dirty.add(full)
+        return overflow
+
+    def collect(self, timeout: float, settle: float):
+        """
+        Block up to `timeout` seconds for changes, then keep reading until the tree has been
+        quiet for `settle` seconds (so half-copied albums are picked up in one go).
+        Returns (dirty_paths, needs_full_scan).
+        """
+        dirty = set()
+        overflow = False
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if not r:
+            return dirty, False
+        deadline = time.time() + max(settle * 10, 30.0)
+        while True:
+            overflow = self._read(dirty) or overflow
+            if time.time() >= deadline:
+                break
+            r, _, _ = select.select([self.fd], [], [], settle)
+            if not r:
+                break
+        return dirty, overflow
+
+class DirPoller:
+    """
+    Fallback for filesystems where inotify doesn't see remote changes (NFS/CIFS).
+    Costs one stat() per directory per poll; only directories whose mtime moved are listed,
+    and every audio file in them (plus any vanished names) is reported as dirty.
+    """
+
+    def __init__(self, root: str):
+        self.dirs = {}  # dir -> (mtime_ns, audio file names, subdir names)
+        self._add_tree(root)
+
+    def _list(self, d: str):
+        files, subdirs = set(), set()
+        with os.scandir(d) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name != "Playlists":
+                        subdirs.add(e.name)
+                elif is_audio(e.name):
+                    files.add(e.name)
+        return files, subdirs
+
+    def _add_tree(self, top: str):
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            if is_playlists_path(d):
+                continue
+            try:
+                mtime = os.stat(d).st_mtime_ns
+                files, subdirs = self._list(d)
+            except OSError:
+                continue
+            self.dirs[d] = (mtime, files, subdirs)
+            stack.extend(os.path.join(d, n) for n in subdirs)
+
+    def _forget_tree(self, top: str):
+        prefix = top.rstrip("/") + "/"
+        for d in [d for d in self.dirs if d == top or d.startswith(prefix)]:
+            del self.dirs[d]
+
+    def poll(self):
+        dirty = set()
+        for d in list(self.dirs):
+            prev = self.dirs.get(d)
+            if prev is None:
+                continue  # dropped along with a removed parent during this pass
+            try:
+                mtime = os.stat(d).st_mtime_ns
+            except OSError:
+                self._forget_tree(d)
+                dirty.add(d)
+                continue
+            if mtime == prev[0]:
+                continue
+            try:
+                files, subdirs = self._list(d)
+            except OSError:
+                continue
+            old_files, old_subdirs = prev[1], prev[2]
+            # re-check every file here: tag editors often rewrite via rename, which keeps the name set
+            dirty.update(os.path.join(d, n) for n in files | old_files)
+            for n in old_subdirs - subdirs:
+                self._forget_tree(os.path.join(d, n))
+                dirty.add(os.path.join(d, n))
+            for n in subdirs - old_subdirs:
+                self._add_tree(os.path.join(d, n))
+                dirty.add(os.path.join(d, n))
+            self.dirs[d] = (mtime, files, subdirs)
+        return dirty
+
+    def collect(self, timeout: float, settle: float):
+        time.sleep(timeout)
+        return self.poll(), False
+
+def print_progress(stats: ScanStats):
+    if not stats.done:
+        print(f"Progress: scanned={stats.scanned} ({stats.files_per_sec:.0f} files/s) "
+              f"tagged={stats.tagged} ({stats.tagged_per_sec:.1f} files/s) skipped={stats.skipped} "
+              f"elapsed={stats.elapsed:.1f}s", flush=True)
+
+def watch(workers: int, use_inotify: bool, poll_interval: float, settle: float):
+    source = None
+    if use_inotify:
+        try:
+            source = InotifyWatcher(MUSIC_ROOT)
+            print(f"Watch: inotify on {len(source.wds)} directories under {MUSIC_ROOT}", flush=True)
+        except (OSError, AttributeError) as e:
+            print(f"Watch: inotify unavailable ({e}); falling back to directory mtime polling", flush=True)
+    if source is None:
+        source = DirPoller(MUSIC_ROOT)
+        print(f"Watch: polling {len(source.dirs)} directories every {poll_interval:.0f}s", flush=True)
+
+    # Watches are in place before the catch-up scan, so nothing changed during it is missed.
+    print(sync_library(workers=workers, progress=print_progress, progress_interval=10).summary(), flush=True)
+
+    timeout = poll_interval if isinstance(source, DirPoller) else 60.0
+    pending = set()
+    while True:
+        dirty, needs_full_scan = source.collect(timeout, settle)
+        pending |= dirty
+        try:
+            if needs_full_scan:
+                print("Watch: event queue overflowed; running a full scan", flush=True)
+                stats = sync_library(workers=workers, progress=print_progress, progress_interval=10)
+                print(stats.summary(), flush=True)
+                pending.clear()
+            elif pending:
+                sync_paths(pending, workers)
+                pending.clear()
+        except sqlite3.OperationalError as e:
+            # e.g. DB locked by another writer; keep the paths and retry next round
+            print(f"Watch: {e}; will retry", flush=True)
+
+def build_arg_parser():
+    ap = argparse.ArgumentParser(description="Index MUSIC_ROOT into jukebox.db in a single pass.")
+    ap.add_argument("--force", action="store_true",
+                    help="Re-read tags for every file and update rows even if mtime/size match")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Tag-reading processes (default: CPU count; 1 reads tags inline)")
+    ap.add_argument("--stat-only", action="store_true",
+                    help="Only record mtime/size for new/changed files; don't read tags")
+    ap.add_argument("--no-prune", action="store_true",
+                    help="Don't delete rows for files that are no longer on disk")
+    ap.add_argument("--no-backup", action="store_true",
+                    help=f"Don't copy the DB to {DB_BACKUP_DIR} before a pruning scan "
+                         f"(the newest {DB_BACKUPS_KEEP} are kept; JUKEBOX_DB_BACKUPS_KEEP)")
+    ap.add_argument("--dir-cache", action="store_true",
+                    help="Skip directories whose mtime and file count are unchanged since the last scan "
+                         "(faster on a NAS, but misses tags rewritten in place)")
+    ap.add_argument("--watch", action="store_true",
+                    help="Stay running and apply library changes as they happen (inotify, else polling)")
+    ap.add_argument("--poll", action="store_true",
+                    help="With --watch: skip inotify and poll directory mtimes (for NAS mounts)")
+    ap.add_argument("--poll-interval", type=float, default=30.0,
+                    help="With --watch --poll: seconds between directory polls (default: 30)")
+    ap.add_argument("--settle", type=float, default=2.0,
+                    help="With --watch: wait for this many quiet seconds before applying changes (default: 2)")
+    return ap
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    workers = max(1, args.workers)
+
+    if args.watch:
+        watch(workers, not args.poll, args.poll_interval, args.settle)
+        return
+
+    stats = sync_library(
+        force=args.force,
+        workers=workers,
+        use_dir_cache=args.dir_cache,
+        stat_only=args.stat_only,
+        prune=not args.no_prune,
+        progress=print_progress,
+        progress_interval=10,
+        backup_dir=None if args.no_backup else DB_BACKUP_DIR,
+    )
+    print(stats.summary(), flush=True)
+
+if __name__ == "__main__":
+    main()
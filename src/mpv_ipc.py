@@ -0,0 +1,267 @@
+"""
+Shared mpv JSON IPC client.
+
+One persistent Unix socket per client. Every command is tagged with a
+request_id and a reader thread routes replies to futures, so any number of
+commands can be in flight from any thread; event lines are never mistaken
+for replies and are handed to subscribers instead. observe_property()
+registrations survive mpv restarts (they are re-sent on reconnect).
+"""
+
+import itertools
+import json
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MPV_SOCKET = "/tmp/radio_mpv.sock"
+
+EventCallback = Callable[[Dict[str, Any]], None]
+PropertyCallback = Callable[[str, Any], None]
+
+
+class MPVClient:
+    def __init__(self, sock_path: str = MPV_SOCKET, timeout: float = 2.0,
+                 log: Optional[Callable[[str], None]] = None) -> None:
+        self.sock_path = sock_path
+        self.timeout = timeout
+        self._log = log
+        self._sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()  # pending / subscribers / observers
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Tuple[Future, socket.socket]] = {}  # request id -> (future, socket sent on)
+        self._subscribers: Dict[Optional[str], List[EventCallback]] = {}
+        self._observers: Dict[int, tuple] = {}  # observe id -> (property, callback)
+        self._reader: Optional[threading.Thread] = None
+        self._closed = False
+        self._connected = threading.Event()
+
+    # -- connection -------------------------------------------------------
+
+    def _debug(self, msg: str) -> None:
+        if self._log:
+            self._log(msg)
+
+    def _connect(self) -> socket.socket:
+        """Connect if needed; caller holds _send_lock."""
+        if self._sock is not None:
+            return self._sock
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(self.sock_path)
+        except OSError:
+            s.close()
+            raise
+        self._sock = s
+        self._connected.set()
+
+        # re-register observers on the new connection (mpv forgets them on restart)
+        with self._lock:
+            observers = list(self._observers.items())
+        for obs_id, (prop, _) in observers:
+            s.sendall(self._encode(["observe_property", obs_id, prop], next(self._ids)))
+
+        self._ensure_reader()
+        return s
+
+    def _ensure_reader(self) -> None:
+        """Start the reader thread if it isn't running; caller holds _send_lock."""
+        if self._reader is None:
+            self._reader = threading.Thread(target=self._read_loop, name="mpv-ipc", daemon=True)
+            self._reader.start()
+
+    def start(self) -> None:
+        """Connect in the background (retrying until mpv is up); needed only for listen-only clients."""
+        with self._send_lock:
+            self._ensure_reader()
+
+    def _drop(self, sock: socket.socket, reason: str) -> None:
+        with self._send_lock:
+            if self._sock is sock:
+                self._sock = None
+                self._connected.clear()
+        try:
+            sock.shutdown(socket.SHUT_RDWR)  # wakes a reader blocked in recv()
+        except OSError:
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+        # only requests sent on this socket: a stale reader must not fail ones sent on a newer one
+        with self._lock:
+            lost = [rid for rid, (_, s) in self._pending.items() if s is sock]
+            futs = [self._pending.pop(rid)[0] for rid in lost]
+        for fut in futs:
+            if not fut.done():
+                fut.set_result({"error": f"mpv_ipc_error: {reason}"})
+
+    def close(self) -> None:
+        self._closed = True
+        sock = self._sock
+        if sock is not None:
+            self._drop(sock, "closed")
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    # -- reader -----------------------------------------------------------
+
+    def _read_loop(self) -> None:
+        while not self._closed:
+            with self._send_lock:
+                sock = self._sock
+                if sock is None:
+                    # listeners keep the client attached across mpv restarts; otherwise the
+                    # next command reconnects and starts a new reader
+                    if not self._observers and not self._subscribers:
+                        self._reader = None
+                        return
+                    try:
+                        sock = self._connect()
+                    except OSError:
+                        sock = None
+            if sock is None:
+                time.sleep(1.0)
+                continue
+
+            buf = b""
+            try:
+                while True:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    buf += chunk
+                    while b"\n" in buf:
+                        line, buf = buf.split(b"\n", 1)
+                        if line.strip():
+                            self._dispatch(line)
+            except OSError:
+                pass
+            self._drop(sock, "socket closed")
+
+    def _dispatch(self, line: bytes) -> None:
+        try:
+            msg = json.loads(line.decode("utf-8", errors="replace"))
+        except ValueError:
+            self._debug(f"MPV bad line: {line[:200]!r}")
+            return
+
+        if "event" not in msg:
+            with self._lock:
+                fut, _ = self._pending.pop(msg.get("request_id"), (None, None))
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+            return
+
+        event = msg["event"]
+        with self._lock:
+            callbacks = self._subscribers.get(event, []) + self._subscribers.get(None, [])
+            observer = self._observers.get(msg.get("id")) if event == "property-change" else None
+        if observer is not None:
+            self._call(observer[1], observer[0], msg.get("data"))
+        for cb in callbacks:
+            self._call(cb, msg)
+
+    def _call(self, cb: Callable, *args: Any) -> None:
+        try:
+            cb(*args)
+        except Exception as e:
+            self._debug(f"MPV callback error: {e}")
+
+    # -- commands ---------------------------------------------------------
+
+    @staticmethod
+    def _encode(command: List[Any], request_id: int) -> bytes:
+        return (json.dumps({"command": command, "request_id": request_id}) + "\n").encode("utf-8")
+
+    def command_async(self, *args: Any) -> "Future[Dict[str, Any]]":
+        """Send without waiting; the future resolves to mpv's reply (or an {"error": ...} dict)."""
+        fut: Future = Future()
+        request_id = next(self._ids)
+        data = self._encode(list(args), request_id)
+        self._debug(f"MPV send: {list(args)}")
+
+        err = ""
+        for attempt in (1, 2):
+            sock = None
+            try:
+                with self._send_lock:
+                    sock = self._connect()
+                    # registered before sending: the reply can arrive before sendall returns
+                    with self._lock:
+                        self._pending[request_id] = (fut, sock)
+                    sock.sendall(data)
+                return fut
+            except FileNotFoundError:
+                err = "mpv_socket_missing"
+                break
+            except OSError as e:
+                err = f"mpv_ipc_error: {e}"
+                if sock is not None:
+                    # stale connection: fail everything else sent on it, retry ours once
+                    with self._lock:
+                        self._pending.pop(request_id, None)
+                    self._drop(sock, err)
+                if attempt == 1:
+                    time.sleep(0.2)
+
+        with self._lock:
+            self._pending.pop(request_id, None)
+        fut.set_result({"error": err})
+        return fut
+
+    def command(self, *args: Any, timeout: Optional[float] = None) -> Dict[str, Any]:
+        fut = self.command_async(*args)
+        try:
+            resp = fut.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            resp = {"error": "mpv_ipc_timeout"}
+        self._debug(f"MPV resp: {resp}")
+        return resp
+
+    def commands(self, *cmds: List[Any]) -> List[Dict[str, Any]]:
+        """Pipeline several commands and wait for all replies."""
+        futs = [self.command_async(*c) for c in cmds]
+        out = []
+        for fut in futs:
+            try:
+                out.append(fut.result(timeout=self.timeout))
+            except FutureTimeout:
+                out.append({"error": "mpv_ipc_timeout"})
+        return out
+
+    def get_property(self, prop: str) -> Optional[Any]:
+        resp = self.command("get_property", prop)
+        if resp.get("error") == "success":
+            return resp.get("data")
+        return None
+
+    def set_property(self, prop: str, value: Any) -> bool:
+        resp = self.command("set_property", prop, value)
+        return resp.get("error") == "success"
+
+    # -- events -----------------------------------------------------------
+
+    def subscribe(self, event: Optional[str], callback: EventCallback) -> None:
+        """callback(msg) for every mpv event named event (None = all), run on the reader thread."""
+        with self._lock:
+            self._subscribers.setdefault(event, []).append(callback)
+
+    def observe_property(self, prop: str, callback: PropertyCallback) -> int:
+        """callback(prop, value) now and on every change; kept across reconnects."""
+        with self._send_lock:
+            with self._lock:
+                obs_id = len(self._observers) + 1
+                self._observers[obs_id] = (prop, callback)
+            # when not connected yet, _connect() registers it along with the others
+            if self._sock is not None:
+                try:
+                    self._sock.sendall(self._encode(["observe_property", obs_id, prop], next(self._ids)))
+                except OSError:
+                    pass  # the reader notices the dead socket and re-registers on reconnect
+            self._ensure_reader()
+        return obs_id
@@ -0,0 +1,105 @@
+"""
+In-memory now-playing state fed by mpv property events.
+
+NowPlaying observes path / metadata / playlist-pos over a shared MPVClient. A
+track change arrives as a burst of property events, so a worker thread lets it
+settle and publishes a new snapshot only when the track actually differs. Every
+snapshot carries a version number: HTTP readers turn it into an ETag, and
+wait() blocks until the version moves on (long-poll).
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+OBSERVED = ("path", "metadata", "playlist-pos")
+SETTLE_SECONDS = 0.05  # a track change arrives as a burst of property events; publish once
+
+Snapshot = Dict[str, Any]
+
+
+def norm_md(md: Any) -> Dict[str, Any]:
+    if not isinstance(md, dict):
+        return {}
+    artist = md.get("ARTIST") or md.get("artist")
+    title  = md.get("TITLE") or md.get("title")
+    album  = md.get("ALBUM") or md.get("album")
+    track  = md.get("track") or md.get("TRACKNUMBER") or md.get("TRACK")
+    year   = md.get("DATE") or md.get("date") or md.get("YEAR") or md.get("year")
+    return {"artist": artist, "title": title, "album": album, "track": track, "year": year}
+
+
+class NowPlaying:
+    def __init__(self, mpv, settle: float = SETTLE_SECONDS,
+                 log: Optional[Callable[[str], None]] = None) -> None:
+        self.mpv = mpv
+        self.settle = settle
+        self._log = log
+        self.version = 0
+        self.snapshot: Snapshot = {}
+        self._raw: Dict[str, Any] = {}
+        self._dirty = threading.Event()
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[Snapshot], None]] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, callback: Callable[[Snapshot], None]) -> None:
+        """callback(snapshot) once per new version, on the worker thread."""
+        self._listeners.append(callback)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="nowplaying", daemon=True)
+        self._thread.start()
+        for prop in OBSERVED:
+            self.mpv.observe_property(prop, self._on_property)
+
+    def _on_property(self, name: str, value: Any) -> None:
+        # runs on the IPC reader thread
+        self._raw[name] = value
+        self._dirty.set()
+
+    def _run(self) -> None:
+        last_sig = None
+        while True:
+            self._dirty.wait()
+            time.sleep(self.settle)
+            self._dirty.clear()
+
+            raw = dict(self._raw)
+            path = raw.get("path")
+            d = norm_md(raw.get("metadata"))
+            sig = (path, raw.get("playlist-pos"), d.get("artist"), d.get("title"), d.get("album"), d.get("track"), d.get("year"))
+            if sig == last_sig:
+                continue
+            last_sig = sig
+
+            snap = {"ts": int(time.time()), "path": path, **d}
+            with self._cond:
+                self.version += 1
+                self.snapshot = snap
+                self._cond.notify_all()
+
+            for cb in self._listeners:
+                try:
+                    cb(snap)
+                except Exception as e:
+                    if self._log:
+                        self._log(f"Now-playing listener error: {e}")
+
+    def bump(self) -> None:
+        """New version of the same snapshot, for when something derived from it (e.g. cover art) changed."""
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def get(self) -> Tuple[int, Snapshot]:
+        with self._cond:
+            return self.version, self.snapshot
+
+    def wait(self, version: int, timeout: float) -> Tuple[int, Snapshot]:
+        """Block until the version differs from `version` (or timeout); returns the current one."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version, self.snapshot
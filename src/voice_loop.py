@@ -2,7 +2,7 @@
 """
 Raspberry Pi 5 Offline Voice Jukebox - voice_loop.py
 
-- Records short voice clips using arecord (Pulse/PipeWire compatible)
+- Streams mic audio from one arecord pipe and cuts utterances with an energy VAD
 - Transcribes using faster-whisper
 - Parses natural voice commands
 - Controls MPV via IPC socket (/tmp/radio_mpv.sock)
@@ -17,7 +17,6 @@ Designed to be robust:
 
 from __future__ import annotations
 
-import json
 import queue
 import os
 import select
@@ -25,17 +24,27 @@ import threading
 import re
 import shlex
 import signal
-import socket
 import sqlite3
 import subprocess
 import sys
-import tempfile
 import time
-import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+try:
+    import numpy as np  # optional: vectorized RMS gate
+except ImportError:
+    np = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from artist_match import ArtistIndex, FUZZY_THRESHOLD, artist_index_path, normalize_text
+from library_db import write_m3u
+from mpv_ipc import MPVClient as MPVIPCClient
+from asr import build_recognizer
+
 # ----------------------------
 # Config (env-overridable)
 # ----------------------------
@@ -50,13 +59,23 @@ STOP_STREAM_SH = os.getenv("STOP_STREAM_SH", "/home/dan/stop_stream.sh")
 ARECORD_DEVICE = os.getenv("ARECORD_DEVICE", "default")
 SAMPLE_RATE = int(os.getenv("VOICE_SAMPLE_RATE", "16000"))
 CHANNELS = int(os.getenv("VOICE_CHANNELS", "1"))
-MAX_RECORD_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "4.5"))
+MAX_RECORD_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "4.5"))  # longest utterance handed to whisper
 SILENCE_RMS_THRESHOLD = float(os.getenv("VOICE_SILENCE_RMS", "180.0"))  # tune if needed
 
-# Whisper
-WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small.en")
-WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")  # cpu on Pi
-WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # good on Pi
+# Streaming capture / energy VAD
+FRAME_MS = int(os.getenv("VOICE_FRAME_MS", "20"))
+VAD_START_MS = int(os.getenv("VOICE_VAD_START_MS", "60"))  # this much speech opens an utterance
+VAD_END_MS = int(os.getenv("VOICE_VAD_END_MS", "600"))  # this much silence closes it
+VAD_PREROLL_MS = int(os.getenv("VOICE_VAD_PREROLL_MS", "300"))  # audio kept from before the onset
+VAD_MIN_SPEECH_MS = int(os.getenv("VOICE_VAD_MIN_SPEECH_MS", "200"))  # shorter blips are dropped
+
+# Pipeline (capture -> transcribe -> dispatch); full queues drop their oldest item
+UTTERANCE_QUEUE_SIZE = int(os.getenv("VOICE_UTTERANCE_QUEUE", "2"))
+COMMAND_QUEUE_SIZE = int(os.getenv("VOICE_COMMAND_QUEUE", "4"))
+
+# Whisper: WHISPER_MODEL / _DEVICE / _COMPUTE_TYPE / _CPU_THREADS / _NUM_WORKERS, see asr.py
+# Two-tier: WHISPER_FAST_MODEL / _FAST_MIN_LOGPROB / _FAST_MAX_NO_SPEECH, see asr.py
+WHISPER_PROMPT_ARTISTS = int(os.getenv("WHISPER_PROMPT_ARTISTS", "40"))  # most-played artists put in the prompt
 
 # Playlist building
 DEFAULT_LIMIT = int(os.getenv("JUKEBOX_DEFAULT_LIMIT", "80"))
@@ -64,6 +83,8 @@ MAX_LIMIT = int(os.getenv("JUKEBOX_MAX_LIMIT", "300"))
 SIMILAR_YEAR_WINDOW = int(os.getenv("JUKEBOX_SIMILAR_YEAR_WINDOW", "2"))  # ± years
 ARTIST_CACHE_REFRESH_SECONDS = int(os.getenv("JUKEBOX_ARTIST_REFRESH", "900"))
 
+VERIFY_PATHS = os.getenv("JUKEBOX_VERIFY_PATHS", "0").strip() in ("1", "true", "yes", "on")  # stat tracks before queueing
+
 # Volume
 VOLUME_STEP = int(os.getenv("JUKEBOX_VOLUME_STEP", "5"))
 VOLUME_MIN = 0
@@ -94,13 +115,6 @@ def safe_int(s: str, default: Optional[int] = None) -> Optional[int]:
     except Exception:
         return default
 
-def normalize_text(t: str) -> str:
-    t = t.strip().lower()
-    # keep digits/letters/spaces, drop most punctuation
-    t = re.sub(r"[^a-z0-9\s']", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
-
 def parse_decade_text(text: str) -> Optional[int]:
     """
     Accepts: "70s", "1970s", "seventies", "80s", "1990s", "two thousands", etc.
@@ -200,82 +214,11 @@ def words_to_number_0_100(text: str) -> Optional[int]:
 # MPV IPC client
 # ----------------------------
 
-class MPVClient:
-    def __init__(self, sock_path: str) -> None:
-        import threading
-        self.sock_path = sock_path
-        self._lock = threading.Lock()
-        self._sock = None
+class MPVClient(MPVIPCClient):
+    """Shared pipelined IPC client (mpv_ipc.py) plus the jukebox's playback helpers."""
 
-    def _close(self) -> None:
-        try:
-            if self._sock is not None:
-                self._sock.close()
-        except Exception:
-            pass
-        self._sock = None
-
-    def _connect(self) -> None:
-        self._close()
-        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        s.settimeout(2.0)
-        s.connect(self.sock_path)
-        self._sock = s
-
-    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        import time
-        data = (json.dumps(payload) + "\n").encode("utf-8")
-        dlog(f"MPV send: {payload}")
-
-        with self._lock:
-            for attempt in (1, 2):
-                try:
-                    if self._sock is None:
-                        self._connect()
-
-                    self._sock.sendall(data)
-
-                    buf = b""
-                    while b"\n" not in buf:
-                        chunk = self._sock.recv(4096)
-                        if not chunk:
-                            raise ConnectionError("mpv IPC socket closed")
-                        buf += chunk
-
-                    line = buf.split(b"\n", 1)[0].decode("utf-8", errors="replace").strip()
-                    if not line:
-                        return {"error": "empty_response"}
-                    resp = json.loads(line)
-                    dlog(f"MPV resp: {resp}")
-                    return resp
-
-                except FileNotFoundError:
-                    self._close()
-                    return {"error": "mpv_socket_missing"}
-                except (socket.timeout, ConnectionError, BrokenPipeError, OSError) as e:
-                    self._close()
-                    if attempt == 1:
-                        time.sleep(0.2)
-                        continue
-                    return {"error": f"mpv_ipc_error: {e}"}
-                except json.JSONDecodeError:
-                    return {"error": "mpv_bad_json_response"}
-                except Exception as e:
-                    self._close()
-                    return {"error": f"mpv_unexpected: {e}"}
-
-    def command(self, *args: Any) -> Dict[str, Any]:
-        return self._send({"command": list(args)})
-
-    def get_property(self, prop: str) -> Optional[Any]:
-        resp = self._send({"command": ["get_property", prop]})
-        if resp.get("error") == "success":
-            return resp.get("data")
-        return None
-
-    def set_property(self, prop: str, value: Any) -> bool:
-        resp = self._send({"command": ["set_property", prop, value]})
-        return resp.get("error") == "success"
+    def __init__(self, sock_path: str) -> None:
+        super().__init__(sock_path, timeout=2.0, log=dlog)
 
     # High-level helpers
     def pause(self) -> None:
@@ -288,8 +231,7 @@ class MPVClient:
         self.command("playlist-next", "force")
 
     def stop_and_clear(self) -> None:
-        self.command("stop")
-        self.command("playlist-clear")
+        self.commands(["stop"], ["playlist-clear"])
 
     def set_volume(self, vol: int) -> None:
         self.set_property("volume", clamp(vol, VOLUME_MIN, VOLUME_MAX))
@@ -304,37 +246,40 @@ class MPVClient:
         self.set_volume(newv)
         return newv
 
-    def load_playlist(self, paths: Sequence[str], clear_first: bool = True) -> bool:
-        # Hard reset so we immediately switch away from whatever is currently playing
-        self.command("stop")
-
-        if clear_first:
-            self.command("playlist-clear")
-
-        ok_any = False
-        first_loaded = False
-
-        for p in paths:
-            if not p:
-                continue
-            if not Path(p).exists():
-                dlog(f"Missing path skipped: {p}")
-                continue
+    def load_playlist(self, paths: Sequence[str], clear_first: bool = True, verify: bool = VERIFY_PATHS) -> bool:
+        """
+        Queue paths with a single `loadlist` of a generated m3u, however long the list.
+        Missing files are skipped by mpv when it reaches them; verify=True checks them
+        up front instead, in parallel (NAS stat round-trips add up).
+        """
+        paths = [p for p in paths if p and "\n" not in p]
+        if verify and paths:
+            with ThreadPoolExecutor(max_workers=16) as ex:
+                exists = list(ex.map(os.path.exists, paths))
+            for p, ok in zip(paths, exists):
+                if not ok:
+                    dlog(f"Missing path skipped: {p}")
+            paths = [p for p, ok in zip(paths, exists) if ok]
+        if not paths:
+            return False
 
-            if not first_loaded:
-                resp = self.command("loadfile", p, "replace")
-                first_loaded = (resp.get("error") == "success")
-                ok_any = ok_any or first_loaded
-            else:
-                resp = self.command("loadfile", p, "append")
-                if resp.get("error") == "success":
-                    ok_any = True
+        m3u = write_m3u(paths)
+        try:
+            # "replace" also stops the current track and starts the first entry;
+            # "append-play" starts playback too if mpv is idle (plain "append" wouldn't)
+            resp = self.command("loadlist", m3u, "replace" if clear_first else "append-play")
+        finally:
+            # mpv parses the list before replying, so the file can go right away
+            try:
+                os.unlink(m3u)
+            except OSError:
+                pass
 
-        if ok_any:
-            self.command("playlist-play-index", 0)
+        ok = resp.get("error") == "success"
+        if ok:
             self.set_property("pause", False)
-
-        return ok_any
+        dlog(f"Queued {len(paths)} tracks via loadlist (ok={ok})")
+        return ok
 
 
 
@@ -360,6 +305,7 @@ class LibraryDB:
         self.table: Optional[str] = None
         self.cols: Dict[str, str] = {}  # logical -> real col name
         self._artist_cache: Tuple[float, List[str]] = (0.0, [])
+        self._artist_index = ArtistIndex([])
 
     def connect(self) -> sqlite3.Connection:
         if self._conn is None:
@@ -473,6 +419,7 @@ class LibraryDB:
 
         if "artist" not in self.cols:
             self._artist_cache = (now, [])
+            self._artist_index = ArtistIndex([])
             return []
 
         conn = self.connect()
@@ -480,9 +427,25 @@ class LibraryDB:
         rows = conn.execute(q).fetchall()
         artists = sorted({(r["artist"] or "").strip() for r in rows if r["artist"]})
         self._artist_cache = (now, artists)
-        dlog(f"Loaded {len(artists)} artists from DB")
+        self._artist_index = ArtistIndex.load_or_build(artists, artist_index_path(self.db_path))
+        dlog(f"Loaded {len(artists)} artists from DB (index built in {time.time() - now:.2f}s)")
         return artists
 
+    def get_artist_index(self) -> ArtistIndex:
+        """Matching index over get_artists(); rebuilt only when the artist list refreshes."""
+        self.get_artists()
+        return self._artist_index
+
+    def get_top_artists(self, n: int) -> List[str]:
+        """Artists with the most tracks, for the recognizer prompt."""
+        if not self.table or not self.cols:
+            self.introspect()
+        if "artist" not in self.cols or n <= 0:
+            return []
+        col = self.cols["artist"]
+        q = f"SELECT {col} AS artist FROM {self.table} WHERE {col} IS NOT NULL AND TRIM({col}) != '' GROUP BY {col} ORDER BY COUNT(*) DESC LIMIT ?"
+        return [r["artist"].strip() for r in self.connect().execute(q, (n,)).fetchall()]
+
     def _build_where(
         self,
         artist: Optional[str],
@@ -663,57 +626,156 @@ class LibraryDB:
 # Voice capture (arecord) + RMS gate
 # ----------------------------
 
-def wav_rms(path: str) -> float:
-    try:
-        with wave.open(path, "rb") as wf:
-            nchan = wf.getnchannels()
-            sampw = wf.getsampwidth()
-            nframes = wf.getnframes()
-            if sampw != 2:
-                # only support 16-bit for RMS gate
-                return 0.0
-            raw = wf.readframes(nframes)
-            if not raw:
-                return 0.0
-            # little-endian int16
-            import array
-            a = array.array("h")
-            a.frombytes(raw)
-            if nchan > 1:
-                # downmix by taking every nchan'th sample (cheap)
-                a = array.array("h", a[::nchan])
-            # RMS
-            ss = 0.0
-            for v in a:
-                ss += float(v) * float(v)
-            mean = ss / max(1, len(a))
-            return mean ** 0.5
-    except Exception:
+def pcm_rms(raw: bytes, nchan: int = 1) -> float:
+    """RMS of little-endian int16 PCM; multi-channel input is downmixed by taking the first channel."""
+    n = len(raw) // 2
+    if n == 0:
         return 0.0
-
-def record_clip(out_wav: str) -> bool:
+    if np is not None:
+        # view the buffer in place; the channel slice is a strided view, not a copy
+        a = np.frombuffer(raw, dtype="<i2", count=n)[::nchan].astype(np.float32)
+        return float(np.sqrt(np.dot(a, a) / a.size))
+
+    import array
+    a = array.array("h")
+    a.frombytes(raw[: n * 2])
+    if nchan > 1:
+        a = a[::nchan]
+    return (sum(v * v for v in a) / max(1, len(a))) ** 0.5
+
+class DropOldestQueue(queue.Queue):
+    """Bounded queue for pipeline stages: put_latest() never blocks, it evicts the oldest item instead."""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(maxsize=max(1, maxsize))
+        self.dropped = 0
+
+    def put_latest(self, item: Any) -> None:
+        with self.not_full:
+            if self._qsize() >= self.maxsize:
+                self._get()
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class AudioStream:
     """
-    Records a short wav clip using arecord.
-    Returns True if recorded, False otherwise.
+    One long-lived `arecord` raw pipe, read in FRAME_MS frames by a background thread.
+    An energy VAD cuts the stream into utterances: recent frames sit in a pre-roll ring
+    buffer, VAD_START_MS of loud frames opens an utterance, VAD_END_MS of quiet frames
+    (or MAX_RECORD_SECONDS) closes it and it is queued for get_utterance() right away.
     """
-    duration_s = max(1, int(round(MAX_RECORD_SECONDS)))
-    cmd = [
-        "arecord",
-        "-D", ARECORD_DEVICE,
-        "-f", "S16_LE",
-        "-r", str(SAMPLE_RATE),
-        "-c", str(CHANNELS),
-        "-d", str(duration_s),
-        "-q",
-        out_wav,
-    ]
-    dlog(f"Recording: {' '.join(shlex.quote(c) for c in cmd)}")
-    try:
-        res = subprocess.run(cmd, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return res.returncode == 0 and Path(out_wav).exists()
-    except FileNotFoundError:
-        log("ERROR: arecord not found. Install alsa-utils.")
-        return False
+
+    def __init__(self, device: str = ARECORD_DEVICE, rate: int = SAMPLE_RATE, nchan: int = CHANNELS) -> None:
+        self.device = device
+        self.rate = rate
+        self.nchan = nchan
+        self.bytes_per_sec = rate * nchan * 2
+        self.frame_bytes = self.bytes_per_sec * FRAME_MS // 1000
+        self.start_frames = max(1, VAD_START_MS // FRAME_MS)
+        self.end_frames = max(1, VAD_END_MS // FRAME_MS)
+        self.min_speech_frames = max(1, VAD_MIN_SPEECH_MS // FRAME_MS)
+        self.max_bytes = int(MAX_RECORD_SECONDS * self.bytes_per_sec)
+
+        self._preroll: "deque[bytes]" = deque(maxlen=max(1, VAD_PREROLL_MS // FRAME_MS))
+        self.utterances = DropOldestQueue(UTTERANCE_QUEUE_SIZE)  # (pcm, ended_at)
+        self._proc: Optional[subprocess.Popen] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._in_speech = False
+        self._run = 0  # consecutive loud frames before onset
+        self._silence = 0  # consecutive quiet frames inside an utterance
+        self._voiced = 0
+        self._buf = bytearray()
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="audio-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+
+    def _spawn(self) -> subprocess.Popen:
+        cmd = [
+            "arecord",
+            "-D", self.device,
+            "-f", "S16_LE",
+            "-r", str(self.rate),
+            "-c", str(self.nchan),
+            "-t", "raw",
+            "-q",
+        ]
+        dlog(f"Capture: {' '.join(shlex.quote(c) for c in cmd)}")
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+
+    def _capture_loop(self) -> None:
+        while self._running:
+            try:
+                self._proc = self._spawn()
+            except FileNotFoundError:
+                log("ERROR: arecord not found. Install alsa-utils.")
+                return
+
+            stdout = self._proc.stdout
+            assert stdout is not None
+            while self._running:
+                frame = stdout.read(self.frame_bytes)
+                if not frame:
+                    break
+                self._feed(frame)
+
+            self._proc.wait()
+            if self._running:
+                log(f"arecord exited (rc={self._proc.returncode}); restarting capture")
+                self._reset()
+                self._preroll.clear()
+                time.sleep(1.0)
+
+    def _feed(self, frame: bytes) -> None:
+        voiced = pcm_rms(frame, self.nchan) >= SILENCE_RMS_THRESHOLD
+
+        if not self._in_speech:
+            self._preroll.append(frame)
+            self._run = self._run + 1 if voiced else 0
+            if self._run >= self.start_frames:
+                self._in_speech = True
+                self._buf = bytearray(b"".join(self._preroll))
+                self._preroll.clear()
+                self._voiced = self._run
+                self._silence = 0
+            return
+
+        self._buf += frame
+        if voiced:
+            self._voiced += 1
+            self._silence = 0
+        else:
+            self._silence += 1
+
+        if self._silence >= self.end_frames or len(self._buf) >= self.max_bytes:
+            if self._voiced >= self.min_speech_frames:
+                self._emit(bytes(self._buf))
+            self._reset()
+
+    def _emit(self, pcm: bytes) -> None:
+        # if the transcriber is behind, the newest utterance wins
+        self.utterances.put_latest((pcm, time.monotonic()))
+
+    def get_utterance(self, timeout: Optional[float] = None) -> Optional[Tuple[bytes, float]]:
+        """Next (pcm, ended_at) utterance, or None after timeout. ended_at is time.monotonic()."""
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
 
 
 # ----------------------------
@@ -755,49 +817,45 @@ CONTROL_INTENTS = {
     "quit",
 }
 
-def best_match_artist(transcript: str, artists: List[str]) -> Optional[str]:
+COMMAND_PHRASES = sorted(i.replace("_", " ") for i in CONTROL_INTENTS) + ["play", "shuffle", "play something by"]
+
+# words a play request can contain without naming an artist
+PLAY_FILLER_WORDS = {
+    "play", "shuffle", "some", "something", "music", "random", "songs", "tracks", "from", "the",
+    "early", "late", "later", "old", "new", "recent", "first", "like", "around", "near", "me", "please",
+    "by", "artist", "genre", "a", "bit", "of", "in", "and", "s",
+}
+
+def fast_tier_accepts(text: str, artists: ArtistIndex) -> bool:
+    """True if a fast-tier transcript can be acted on without re-decoding with the full model."""
+    cmd = parse_intent(text, artists)
+    if cmd.intent in CONTROL_INTENTS:
+        return True
+    if cmd.intent != "play":
+        return False
+    if cmd.artist:
+        return True
+    # a play request with words we couldn't place may be a misheard artist name
+    leftover = [
+        w for w in normalize_text(text).split()
+        if w not in PLAY_FILLER_WORDS and not re.search(r"\d", w) and parse_decade_text(w) is None
+    ]
+    return not leftover
+
+def best_match_artist(transcript: str, artists: ArtistIndex, fuzzy_threshold: Optional[float] = None) -> Optional[str]:
     """
     Attempts to identify the intended artist from transcript using:
     1) exact/contains match
     2) token overlap scoring
+    3) if fuzzy_threshold is given, trigram/phonetic matching for misheard names
     """
-    if not artists:
-        return None
-
-    t = normalize_text(transcript)
-    if not t:
-        return None
-
-    # quick contains: pick the longest artist name contained in transcript
-    contained = [a for a in artists if normalize_text(a) and normalize_text(a) in t]
-    if contained:
-        contained.sort(key=lambda x: len(x), reverse=True)
-        return contained[0]
-
-    # token overlap scoring
-    t_tokens = set(t.split())
-    best = None
-    best_score = 0.0
-    for a in artists:
-        an = normalize_text(a)
-        if not an:
-            continue
-        a_tokens = set(an.split())
-        if not a_tokens:
-            continue
-        overlap = len(t_tokens & a_tokens)
-        if overlap == 0:
-            continue
-        score = overlap / max(1, len(a_tokens))
-        # slight bias towards longer names when tied
-        score += min(0.15, len(an) / 200.0)
-        if score > best_score:
-            best_score = score
-            best = a
-
-    if best_score >= 0.60:
-        return best
-    return None
+    artist = artists.best_match(transcript)
+    if artist is None and fuzzy_threshold is not None:
+        candidates = artists.fuzzy_candidates(transcript, limit=3)
+        dlog(f"Fuzzy artist candidates: {candidates}")
+        if candidates and candidates[0][1] >= fuzzy_threshold:
+            artist = candidates[0][0]
+    return artist
 
 def extract_genre(transcript: str) -> Optional[str]:
     """
@@ -817,7 +875,7 @@ def extract_genre(transcript: str) -> Optional[str]:
         return g if g else None
     return None
 
-def parse_intent(transcript: str, artists: List[str]) -> ParsedCommand:
+def parse_intent(transcript: str, artists: ArtistIndex) -> ParsedCommand:
     t = normalize_text(transcript)
 
     # Quit
@@ -921,7 +979,7 @@ def parse_intent(transcript: str, artists: List[str]) -> ParsedCommand:
         explicit_artist = False
 
     if explicit_artist:
-        artist = best_match_artist(t, artists)
+        artist = best_match_artist(t, artists, fuzzy_threshold=FUZZY_THRESHOLD)
         # Avoid accidental ultra-short artist matches unless explicitly requested.
         if artist and len(artist.strip()) >= 3:
            cmd.artist = artist
@@ -993,44 +1051,6 @@ def run_script(path: str) -> bool:
         return False
 
 
-# ----------------------------
-# Whisper transcription
-# ----------------------------
-
-class WhisperTranscriber:
-    def __init__(self) -> None:
-        self.model = None
-
-    def load(self) -> None:
-        from faster_whisper import WhisperModel  # type: ignore
-        log(f"Loading whisper model: {WHISPER_MODEL} ({WHISPER_DEVICE}/{WHISPER_COMPUTE_TYPE})")
-        self.model = WhisperModel(
-            WHISPER_MODEL,
-            device=WHISPER_DEVICE,
-            compute_type=WHISPER_COMPUTE_TYPE,
-        )
-        log("Whisper ready.")
-
-    def transcribe(self, wav_path: str) -> str:
-        if self.model is None:
-            self.load()
-
-        # faster-whisper returns segments generator + info
-        segments, info = self.model.transcribe(
-            wav_path,
-            language="en",
-            vad_filter=True,
-            beam_size=1,
-        )
-        text_parts: List[str] = []
-        for seg in segments:
-            if seg.text:
-                text_parts.append(seg.text.strip())
-        out = " ".join(text_parts).strip()
-        dlog(f"Transcript (lang={getattr(info, 'language', None)}): {out}")
-        return out
-
-
 # ----------------------------
 # Action dispatcher
 # ----------------------------
@@ -1054,7 +1074,7 @@ class VoiceJukebox:
     def __init__(self) -> None:
         self.db = LibraryDB(DB_PATH)
         self.mpv = MPVClient(MPV_SOCKET)
-        self.whisper = WhisperTranscriber()
+        self.whisper = build_recognizer()
         self._running = True
 
         # warm-up db introspection
@@ -1201,13 +1221,13 @@ def main() -> int:
     log("Voice Jukebox starting…")
     log(f"DB: {DB_PATH}")
     log(f"MPV IPC: {MPV_SOCKET}")
-    log(f"arecord device: {ARECORD_DEVICE} @ {SAMPLE_RATE}Hz ch={CHANNELS} dur={MAX_RECORD_SECONDS}s")
+    log(f"arecord device: {ARECORD_DEVICE} @ {SAMPLE_RATE}Hz ch={CHANNELS} max={MAX_RECORD_SECONDS}s (streaming VAD)")
     if DEBUG:
         log("DEBUG enabled.")
 
     jukebox = VoiceJukebox()
     jukebox._fifo_q = queue.SimpleQueue()
-    jukebox._artists_cache = []  # shared snapshot for FIFO thread
+    jukebox._artists_cache = ArtistIndex([])  # shared snapshot for the transcription thread
 
     # Dashboard/FIFO control (non-blocking): allows web UI to send commands like "shuffle all"
     def _fifo_loop() -> None:
@@ -1274,11 +1294,48 @@ def main() -> int:
         log(f"ERROR: whisper failed to load: {e}")
         return 2
 
-    log("Listening. Speak a command every few seconds (short phrases work best).")
+    stream = AudioStream()
+    stream.start()
+    commands = DropOldestQueue(COMMAND_QUEUE_SIZE)  # (text_n, ended_at, transcribed_at)
+
+    # Transcription worker: keeps decoding while the main thread loads playlists,
+    # and the capture thread keeps listening while either of them is busy.
+    def _transcribe_loop() -> None:
+        while jukebox._running:
+            utt = stream.get_utterance(timeout=0.5)
+            if utt is None:
+                continue
+            pcm, ended_at = utt
+            started = time.monotonic()
+            try:
+                result = jukebox.whisper.transcribe_pcm(
+                    pcm, stream.rate, stream.nchan,
+                    accept=lambda text: fast_tier_accepts(text, jukebox._artists_cache),
+                )
+            except Exception as e:
+                log(f"Transcribe error: {e}")
+                continue
+            done = time.monotonic()
+            text = result.text
+            dlog(f"ASR: audio {len(pcm) / stream.bytes_per_sec:.2f}s | queued {started - ended_at:.2f}s | "
+                 f"decode {done - started:.2f}s ({result.tier}, logprob {result.avg_logprob:.2f}) | "
+                 f"utterance q={stream.utterances.qsize()} dropped={stream.utterances.dropped}")
+            if result.escalated:
+                dlog(f"ASR escalated: {result.escalated}")
+
+            text_n = normalize_text(text)
+            if not text_n or len(text_n) < 2:
+                continue
+            commands.put_latest((text_n, ended_at, done))
+
+    threading.Thread(target=_transcribe_loop, name="transcribe", daemon=True).start()
+
+    log("Listening. Speak a command any time (short phrases work best).")
     log("Say 'help' for examples, or 'quit' to stop the voice loop.")
 
     last_artist_refresh = 0.0
 
+    # Main thread is the dispatcher (keeps SQLite/MPV single-threaded)
     while True:
         if not jukebox._running:
             break
@@ -1289,7 +1346,7 @@ def main() -> int:
             while True:
                 text_n = jukebox._fifo_q.get_nowait()
                 log(f"FIFO->MAIN: {text_n}")
-                artists = jukebox.db.get_artists()
+                artists = jukebox.db.get_artist_index()
                 cmd = parse_intent(text_n, artists)
                 jukebox.handle(cmd)
         except Exception:
@@ -1300,46 +1357,34 @@ def main() -> int:
         now = time.time()
         if now - last_artist_refresh > ARTIST_CACHE_REFRESH_SECONDS:
             try:
-                jukebox._artists_cache = jukebox.db.get_artists()
+                jukebox._artists_cache = jukebox.db.get_artist_index()
+                jukebox.whisper.set_vocabulary(COMMAND_PHRASES, jukebox.db.get_top_artists(WHISPER_PROMPT_ARTISTS))
             except Exception as e:
                 dlog(f"Artist refresh warning: {e}")
             last_artist_refresh = now
 
-        with tempfile.TemporaryDirectory(prefix="voiceclip_") as td:
-            wav_path = str(Path(td) / "clip.wav")
-
-            ok = record_clip(wav_path)
-            if not ok:
-                time.sleep(0.5)
-                continue
-
-            rms = wav_rms(wav_path)
-            dlog(f"RMS={rms:.1f}")
-            if rms < SILENCE_RMS_THRESHOLD:
-                # Mostly silence; skip transcription
-                continue
-
-            try:
-                text = jukebox.whisper.transcribe(wav_path)
-            except Exception as e:
-                log(f"Transcribe error: {e}")
-                continue
-
-            text_n = normalize_text(text)
-            if not text_n or len(text_n) < 2:
-                continue
+        # short timeout so FIFO commands and the artist refresh are never starved
+        try:
+            text_n, ended_at, transcribed_at = commands.get(timeout=0.5)
+        except queue.Empty:
+            continue
 
-            log(f"Heard: {text_n}")
+        log(f"Heard: {text_n}")
 
-            try:
-                artists = jukebox.db.get_artists()
-                jukebox._artists_cache = artists
-                cmd = parse_intent(text_n, artists)
-                log(f"DEBUG CMD intent={getattr(cmd,'intent',None)} artist={getattr(cmd,'artist',None)} decade={getattr(cmd,'decade',None)} similar_year={getattr(cmd,'similar_year',None)} genre={getattr(cmd,'genre',None)} early_late={getattr(cmd,'early_late',None)} limit={getattr(cmd,'limit',None)}")
-                jukebox.handle(cmd)
-            except Exception as e:
-                log(f"Command handling error: {e}")
+        started = time.monotonic()
+        try:
+            artists = jukebox.db.get_artist_index()
+            jukebox._artists_cache = artists
+            cmd = parse_intent(text_n, artists)
+            log(f"DEBUG CMD intent={getattr(cmd,'intent',None)} artist={getattr(cmd,'artist',None)} decade={getattr(cmd,'decade',None)} similar_year={getattr(cmd,'similar_year',None)} genre={getattr(cmd,'genre',None)} early_late={getattr(cmd,'early_late',None)} limit={getattr(cmd,'limit',None)}")
+            jukebox.handle(cmd)
+        except Exception as e:
+            log(f"Command handling error: {e}")
+        done = time.monotonic()
+        dlog(f"Dispatch: queued {started - transcribed_at:.2f}s | handle {done - started:.2f}s | "
+             f"speech end -> handled {done - ended_at:.2f}s | command q={commands.qsize()} dropped={commands.dropped}")
 
+    stream.stop()
     jukebox.db.close()
     log("Voice Jukebox stopped.")
     return 0
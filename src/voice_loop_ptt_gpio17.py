@@ -11,12 +11,14 @@ import random
 import subprocess
 import time
 from pathlib import Path
-from difflib import get_close_matches
-from faster_whisper import WhisperModel
 from library_db import db_connect, fetch_tracks_for_artist, fetch_tracks_for_artist_year_range, build_target_playlist, write_m3u
+from artist_match import ArtistIndex, FUZZY_THRESHOLD, normalize_text
+from asr import WhisperTranscriber
 
 AUDIO_FILE = "utterance.wav"
 ARTISTS_FILE = "artists.txt"
+# pickled ArtistIndex next to ARTISTS_FILE; rebuilt automatically when the artist list changes
+ARTISTS_INDEX_FILE = ARTISTS_FILE + ".idx"
 MUSIC_ROOT = "/mnt/lossless"
 PLAYLIST_SECONDS = 3600
 
@@ -128,7 +130,7 @@ def detect_decade(text):
 
     return None, None, None
 
-def pick_artist(user_text, artists):
+def pick_artist(user_text, artists: ArtistIndex):
     t = normalize(user_text)
     t = re.sub(r"^(play|put on|start|shuffle)\s+", "", t).strip()
 
@@ -138,16 +140,14 @@ def pick_artist(user_text, artists):
     t = re.sub(r"\b(19[0-9]{2}|20[0-9]{2})\b", " ", t)
     t = re.sub(r"\s+", " ", t).strip()
 
-    for a in artists:
-        an = normalize(a)
-        if an and an in t:
-            return a
+    a = artists.longest_contained(normalize_text(t))
+    if a:
+        return a
 
-    norm_map = {normalize(a): a for a in artists}
-    candidates = get_close_matches(t, list(norm_map.keys()), n=3, cutoff=0.6)
-    if not candidates:
+    candidates = artists.fuzzy_candidates(t, limit=3)
+    if not candidates or candidates[0][1] < FUZZY_THRESHOLD:
         return "NONE"
-    return norm_map[candidates[0]]
+    return candidates[0][0]
 
 def record_audio():
     PIN = os.environ.get("VOICE_PTT_PIN", "17")
@@ -172,8 +172,7 @@ def record_audio():
     print("Recorded.", flush=True)
 
 def transcribe(asr_model):
-    segments, _ = asr_model.transcribe(AUDIO_FILE, language="en")
-    return "".join(s.text for s in segments).strip()
+    return asr_model.transcribe_wav(AUDIO_FILE)
 def stop_current():
     global current_player
     if current_player and current_player.poll() is None:
@@ -237,12 +236,13 @@ def play_random_sqlite():
 def main():
     global current_player
     print("Voice Jukebox ready. Ctrl+C to quit.")
-    artists = load_artists()
+    artists = ArtistIndex.load_or_build(load_artists(), ARTISTS_INDEX_FILE)
     print(f"Loaded {len(artists)} artists.")
     print("Using SQLite index: /home/dan/jukebox.db")
 
     print("Loading ASR model...")
-    asr = WhisperModel("small", compute_type="int8")
+    asr = WhisperTranscriber(model_name=os.environ.get("WHISPER_MODEL", "small"))
+    asr.load()
     print("Ready.")
 
     while True:
@@ -1,21 +1,45 @@
 #!/usr/bin/env python3
 
 from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
+import itertools
 import json
+import multiprocessing
 import os
 import subprocess
-import socket
-import urllib.request
-import re
+import sys
+import threading
+import array
+import math
+import select
 import time
 
+try:
+    import numpy as np
+except ImportError:  # pure-Python level math
+    np = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import library_index
+from cover_cache import CoverCache
+from icecast import ICECAST_MOUNT, IcecastHTTP
+from mpv_ipc import MPVClient
+from nowplaying import NowPlaying
+
 ROOT = "/home/dan/shuffle-player/web/shufflizer"
 PORT = 8091
 MPV_SOCKET = "/tmp/radio_mpv.sock"
-NOWPLAYING_JSON = "/home/dan/shuffle-player/web/shufflizer/nowplaying.json"
-RESYNC_SCRIPT = "/home/dan/shuffle-player/scripts/resync_jukebox_db.sh"
-COVER_CACHE = os.path.join(ROOT, "nowplaying_cover.jpg")
+NOWPLAYING_MAX_WAIT = 30  # seconds a ?wait= long-poll may be held open
+VU_RATE = 22050
+VU_BLOCK_MS = 100  # one level reading per block
+VU_IDLE_SECONDS = 10  # stop the meter's ffmpeg when nobody reads levels
+VU_STREAM_HZ = 10  # max events/s per /api/vu/stream client
+SERVICE_STATE_TTL = 2.0  # seconds unit states are shared between requests
+ICECAST_STATUS_INTERVAL = 5.0  # seconds between status-json.xsl polls
+COVER_PREFETCH_AHEAD = 5  # upcoming playlist entries whose covers are warmed
+RESYNC_WORKERS = 2
+MAX_JOBS = 20
+COVER_DIR = os.path.join(ROOT, "covers")  # content-addressed, served as /covers/<name>
 
 SERVICES = {
     "icecast": "icecast2.service",
@@ -34,39 +58,144 @@ AUDIO_ENV = {
     "PULSE_SERVER": "unix:/run/user/1000/pulse/native",
 }
 
-_LAST_COVER_TRACK = None
-_LAST_COVER_URL = ""
+COVERS = CoverCache(COVER_DIR)
+
+# one persistent, pipelined IPC connection shared by all request threads
+MPV = MPVClient(MPV_SOCKET)
+
+# now-playing state fed by mpv events; the response is rendered once per version
+NOWPLAYING = NowPlaying(MPV)
+_NP_BOOT = f"{int(time.time()):x}"  # keeps ETags from matching across restarts
+_NP_RENDERED = (None, None)
+_NP_LOCK = threading.Lock()
+
+_SERVICE_UNITS = set(SERVICES.values()) | {"snapserver.service", "shuffle-snapfifo-feed.service"}
+_SERVICE_STATES = (0.0, None)  # (fetched at, unit -> ActiveState)
+_SERVICE_LOCK = threading.Lock()
+
+_JOBS = {}
+_JOB_IDS = itertools.count(1)  # unique even after old jobs are dropped from _JOBS
+_JOBS_LOCK = threading.Lock()
+_ACTIVE_JOB = None
 
 
 def run(cmd):
     return subprocess.run(cmd, capture_output=True, text=True)
 
 
-def is_active(service):
-    r = run(["sudo", "systemctl", "is-active", service])
-    return (r.returncode == 0) and (r.stdout.strip() == "active")
+def _fetch_service_states(units):
+    """ActiveState of every unit from one `systemctl show`, or None if the query failed."""
+    r = run(["systemctl", "show", "--property=ActiveState", "--", *units])
+    # one block per unit, in argument order; keyed on the name asked for, since Id
+    # would be the unit an alias resolves to
+    blocks = r.stdout.strip().split("\n\n")
+    if r.returncode != 0 or len(blocks) != len(units):
+        return None
+    states = {}
+    for unit, block in zip(units, blocks):
+        props = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        states[unit] = props.get("ActiveState", "")
+    return states
 
 
-def icecast_mp3_active():
-    try:
-        with urllib.request.urlopen("http://127.0.0.1:8001/status-json.xsl", timeout=2) as r:
-            data = json.loads(r.read().decode())
+def service_states():
+    """unit -> ActiveState for all known units, shared by every request for SERVICE_STATE_TTL."""
+    global _SERVICE_STATES
+    with _SERVICE_LOCK:
+        fetched_at, states = _SERVICE_STATES
+        if states is None or time.monotonic() - fetched_at > SERVICE_STATE_TTL:
+            states = _fetch_service_states(sorted(_SERVICE_UNITS))
+            if states is None:
+                return {}  # not cached: the next request asks again
+            _SERVICE_STATES = (time.monotonic(), states)
+        return states
 
-        src = data.get("icestats", {}).get("source")
 
-        if isinstance(src, list):
-            for s in src:
-                if s.get("listenurl", "").endswith("/stream.mp3"):
-                    return True
+def invalidate_service_states():
+    global _SERVICE_STATES
+    with _SERVICE_LOCK:
+        _SERVICE_STATES = (0.0, None)
 
-        elif isinstance(src, dict):
-            if src.get("listenurl", "").endswith("/stream.mp3"):
-                return True
 
-    except Exception:
-        pass
+def systemctl(action, unit):
+    r = run(["sudo", "systemctl", action, unit])
+    invalidate_service_states()
+    return r
+
+
+def is_active(service):
+    if service not in _SERVICE_UNITS:
+        with _SERVICE_LOCK:
+            _SERVICE_UNITS.add(service)
+        invalidate_service_states()
+    return service_states().get(service) == "active"
+
+
+def icecast_mount_stats(status, mount=ICECAST_MOUNT):
+    """Structured stats for one mount from a status-json.xsl document."""
+    icestats = status.get("icestats", {}) if isinstance(status, dict) else {}
+    sources = icestats.get("source") or []
+    if isinstance(sources, dict):
+        sources = [sources]
+
+    src = next((x for x in sources if str(x.get("listenurl", "")).endswith(mount)), None)
+    stats = {
+        "mount": mount,
+        "active": src is not None,
+        "server_start": icestats.get("server_start_iso8601") or icestats.get("server_start"),
+    }
+    if src is not None:
+        stats.update({
+            "listeners": src.get("listeners"),
+            "listener_peak": src.get("listener_peak"),
+            "stream_start": src.get("stream_start_iso8601") or src.get("stream_start"),
+            "bitrate": src.get("audio_bitrate") or src.get("bitrate"),
+            "total_bytes_sent": src.get("total_bytes_sent"),
+            "total_bytes_read": src.get("total_bytes_read"),
+            "title": src.get("title"),
+        })
+    return stats
+
+
+class IcecastStats:
+    """Polls status-json.xsl every ICECAST_STATUS_INTERVAL over one kept-alive connection."""
+
+    def __init__(self):
+        self.http = IcecastHTTP(timeout=2)
+        self.snapshot = {"ok": False, "mount": ICECAST_MOUNT, "active": False, "updated": None, "error": "not polled yet"}
+        self._poll_lock = threading.Lock()  # one poll at a time, so an older result never overwrites a newer one
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="icecast-stats", daemon=True)
+            self._thread.start()
+
+    def poll(self):
+        """
+        Fetch status now, in the caller's thread (bounded by the 2 s HTTP timeout), and
+        return the new snapshot; used after starting/stopping the stream so the reply isn't stale.
+        """
+        with self._poll_lock:
+            try:
+                snap = {"ok": True, **icecast_mount_stats(self.http.get_json("/status-json.xsl")), "error": None}
+            except Exception as e:
+                snap = {"ok": False, "mount": ICECAST_MOUNT, "active": False, "error": str(e)}
+            snap["updated"] = int(time.time())
+            self.snapshot = snap  # replaced whole; readers never see a half-built dict
+            return snap
+
+    def _run(self):
+        while True:
+            self.poll()
+            time.sleep(ICECAST_STATUS_INTERVAL)
+
 
-    return False
+ICECAST_STATS = IcecastStats()
+
+
+def icecast_mp3_active():
+    return ICECAST_STATS.snapshot["active"]
 
 
 def resolve_art_url(data):
@@ -105,44 +234,8 @@ def resolve_art_url(data):
     return ""
 
 
-def mpv_ipc(command):
-    request_id = int(time.time() * 1000) % 1000000000
-    payload = json.dumps({"command": command, "request_id": request_id}) + "\n"
-
-    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-        s.settimeout(2)
-        s.connect(MPV_SOCKET)
-        s.sendall(payload.encode("utf-8"))
-
-        buf = b""
-        while True:
-            chunk = s.recv(4096)
-            if not chunk:
-                break
-            buf += chunk
-
-            while b"\n" in buf:
-                line, buf = buf.split(b"\n", 1)
-                if not line.strip():
-                    continue
-                try:
-                    msg = json.loads(line.decode("utf-8", errors="replace"))
-                except Exception:
-                    continue
-                if msg.get("request_id") == request_id:
-                    return msg
-
-    return None
-
-
 def mpv_get_property(prop):
-    try:
-        msg = mpv_ipc(["get_property", prop])
-        if msg and msg.get("error") == "success":
-            return msg.get("data")
-    except Exception:
-        pass
-    return None
+    return MPV.get_property(prop)
 
 
 def get_current_track_path(nowplaying_data=None):
@@ -175,181 +268,226 @@ def get_current_track_path(nowplaying_data=None):
     return ""
 
 
-def find_folder_art(track_path):
-    if not track_path:
-        return ""
+def cover_url(name):
+    return f"/covers/{name}" if name else ""
 
-    folder = os.path.dirname(track_path)
-    names = (
-        "cover.jpg",
-        "cover.jpeg",
-        "cover.png",
-        "folder.jpg",
-        "folder.jpeg",
-        "folder.png",
-        "front.jpg",
-        "front.jpeg",
-        "front.png",
-    )
 
-    for name in names:
-        candidate = os.path.join(folder, name)
-        if os.path.exists(candidate):
+def get_nowplaying_art(nowplaying_data):
+    explicit = resolve_art_url(nowplaying_data)
+    if explicit:
+        return explicit
+
+    track_path = get_current_track_path(nowplaying_data)
+    if not track_path:
+        return ""
+    # never extract here: a cache miss is handed to the prefetcher, which bumps the
+    # now-playing version once the cover is in
+    name = COVERS.lookup(track_path)
+    if name is None:
+        PREFETCH.want(track_path)
+        return ""
+    return cover_url(name)
+
+
+class CoverPrefetcher:
+    """Warms the cover cache for the current track and the next COVER_PREFETCH_AHEAD playlist entries."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._urgent = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cover-prefetch", daemon=True)
+            self._thread.start()
+            MPV.observe_property("playlist-pos", lambda _name, _value: self._wake.set())
+
+    def want(self, track_path):
+        """The current track's cover is missing: fetch it before anything else."""
+        self._urgent = track_path
+        self._wake.set()
+
+    def upcoming(self):
+        pos = mpv_get_property("playlist-pos")
+        count = mpv_get_property("playlist-count")
+        if not isinstance(pos, int) or not isinstance(count, int) or pos < 0:
+            return []
+
+        # playlist/N/filename sub-properties: a few pipelined requests instead of the whole playlist
+        indexes = range(pos + 1, min(count, pos + 1 + COVER_PREFETCH_AHEAD))
+        replies = MPV.commands(*[["get_property", f"playlist/{i}/filename"] for i in indexes])
+        workdir = mpv_get_property("working-directory") or ""
+
+        paths = []
+        for resp in replies:
+            raw = resp.get("data") if resp.get("error") == "success" else None
+            if isinstance(raw, str) and raw and "://" not in raw:
+                paths.append(raw if os.path.isabs(raw) else os.path.abspath(os.path.join(workdir, raw)))
+        return paths
+
+    def _warm(self, track_path):
+        name = COVERS.lookup(track_path)
+        if name is None:
             try:
-                rel = os.path.relpath(candidate, ROOT)
-                if not rel.startswith(".."):
-                    return "/" + rel.replace(os.sep, "/")
+                name = COVERS.resolve(track_path)
             except Exception:
-                pass
+                name = ""
+        return name
 
-    return ""
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
 
+            urgent, self._urgent = self._urgent, None
+            if urgent and self._warm(urgent):
+                NOWPLAYING.bump()
 
-def cover_cache_url():
-    if os.path.exists(COVER_CACHE):
-        return f"/nowplaying_cover.jpg?t={int(os.path.getmtime(COVER_CACHE))}"
-    return ""
+            try:
+                paths = self.upcoming()
+            except Exception:
+                paths = []
+            for path in paths:
+                if self._urgent:
+                    self._wake.set()  # go back for the current track first
+                    break
+                self._warm(path)
 
 
-def extract_embedded_cover(track_path):
-    if not track_path or not os.path.exists(track_path):
-        return ""
+PREFETCH = CoverPrefetcher()
 
-    try:
-        if os.path.exists(COVER_CACHE):
-            os.remove(COVER_CACHE)
-    except Exception:
-        pass
 
-    cmd = [
-        "/usr/bin/ffmpeg",
-        "-y",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-i",
-        track_path,
-        "-an",
-        "-map",
-        "0:v:0",
-        "-frames:v",
-        "1",
-        "-c:v",
-        "mjpeg",
-        COVER_CACHE,
-    ]
+def db_to_percent(db_value):
+    if db_value is None:
+        return 0
 
-    try:
-        r = subprocess.run(cmd, capture_output=True, text=True, timeout=8)
-        if r.returncode == 0 and os.path.exists(COVER_CACHE) and os.path.getsize(COVER_CACHE) > 0:
-            return cover_cache_url()
-    except Exception:
-        pass
+    db_value = max(-60.0, min(0.0, db_value))
+    return int(round(((db_value + 60.0) / 60.0) * 100))
 
-    return ""
 
+def _silent_levels():
+    return {"left": 0, "right": 0, "left_db": None, "right_db": None, "left_rms_db": None, "right_rms_db": None}
 
-def get_nowplaying_art(nowplaying_data):
-    global _LAST_COVER_TRACK, _LAST_COVER_URL
 
-    explicit = resolve_art_url(nowplaying_data)
-    if explicit:
-        _LAST_COVER_TRACK = None
-        _LAST_COVER_URL = explicit
-        return explicit
+def _to_db(value):
+    return round(20.0 * math.log10(value / 32768.0), 1) if value > 0 else None
 
-    track_path = get_current_track_path(nowplaying_data)
 
-    if track_path and track_path == _LAST_COVER_TRACK:
-        if _LAST_COVER_URL:
-            return _LAST_COVER_URL
-        if os.path.exists(COVER_CACHE):
-            _LAST_COVER_URL = cover_cache_url()
-            return _LAST_COVER_URL
-
-    extracted = extract_embedded_cover(track_path)
-    if extracted:
-        _LAST_COVER_TRACK = track_path
-        _LAST_COVER_URL = extracted
-        return extracted
-
-    folder_art = find_folder_art(track_path)
-    if folder_art:
-        _LAST_COVER_TRACK = track_path
-        _LAST_COVER_URL = folder_art
-        return folder_art
-
-    _LAST_COVER_TRACK = track_path or None
-    _LAST_COVER_URL = ""
-    return ""
+def pcm_levels(raw):
+    """Peak/RMS dB per channel of interleaved s16le stereo PCM."""
+    if np is not None:
+        a = np.frombuffer(raw, dtype="<i2").reshape(-1, 2).astype(np.float64)
+        peaks = np.abs(a).max(axis=0)
+        rms = np.sqrt((a * a).mean(axis=0))
+    else:
+        a = array.array("h", raw)
+        if sys.byteorder != "little":
+            a.byteswap()
+        peaks, rms = [], []
+        for ch in (a[0::2], a[1::2]):
+            peaks.append(max(max(ch), -min(ch)))
+            rms.append(math.sqrt(sum(x * x for x in ch) / len(ch)))
+
+    left_db, right_db = _to_db(float(peaks[0])), _to_db(float(peaks[1]))
+    return {
+        "left": db_to_percent(left_db),
+        "right": db_to_percent(right_db),
+        "left_db": left_db,
+        "right_db": right_db,
+        "left_rms_db": _to_db(float(rms[0])),
+        "right_rms_db": _to_db(float(rms[1])),
+    }
 
 
-def db_to_percent(db_value):
-    if db_value is None:
-        return 0
+class VuMeter:
+    """
+    One long-lived ffmpeg reading raw PCM from the sink monitor; levels are computed
+    per VU_BLOCK_MS block and kept in memory. Started by the first reader and stopped
+    after VU_IDLE_SECONDS without one.
+    """
+
+    def __init__(self):
+        self.levels = _silent_levels()
+        self.seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._last_read = 0.0
+
+    def read(self):
+        """Latest levels; (re)starts the sampler if needed."""
+        with self._cond:
+            self._last_read = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vu-meter", daemon=True)
+                self._thread.start()
+            return self.seq, self.levels
+
+    def wait(self, seq, timeout):
+        """Block until levels newer than seq arrive (or timeout); keeps the sampler alive."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != seq, timeout)
+        return self.read()
+
+    def _idle(self):
+        with self._cond:
+            if time.monotonic() - self._last_read < VU_IDLE_SECONDS:
+                return False
+            self._thread = None
+            self.levels = _silent_levels()
+            return True
+
+    def _publish(self, levels):
+        with self._cond:
+            self.levels = levels
+            self.seq += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        block = VU_RATE * VU_BLOCK_MS // 1000 * 4  # s16 stereo
+        cmd = [
+            "/usr/bin/ffmpeg", "-nostdin", "-hide_banner", "-nostats", "-loglevel", "error",
+            "-f", "pulse", "-fragment_size", str(block), "-i", "radio_sink.monitor",
+            "-ac", "2", "-ar", str(VU_RATE), "-f", "s16le", "-",
+        ]
+        while True:
+            try:
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=AUDIO_ENV)
+            except OSError:
+                proc = None
+
+            buf = b""
+            while proc is not None:
+                if self._idle():
+                    proc.kill()
+                    proc.wait()
+                    return
+                # a suspended sink sends nothing; don't block past the idle check
+                ready, _, _ = select.select([proc.stdout], [], [], 1.0)
+                if not ready:
+                    self._publish(_silent_levels())
+                    continue
+                chunk = os.read(proc.stdout.fileno(), block)
+                if not chunk:
+                    break
+                buf += chunk
+                while len(buf) >= block:
+                    self._publish(pcm_levels(buf[:block]))
+                    buf = buf[block:]
 
-    db_value = max(-60.0, min(0.0, db_value))
-    return int(round(((db_value + 60.0) / 60.0) * 100))
+            if proc is not None:
+                proc.wait()
+            self._publish(_silent_levels())
+            if self._idle():
+                return
+            time.sleep(1.0)
 
 
-def get_vu_levels():
-    cmd = [
-        "/usr/bin/ffmpeg",
-        "-nostdin",
-        "-hide_banner",
-        "-nostats",
-        "-loglevel",
-        "info",
-        "-f",
-        "pulse",
-        "-i",
-        "radio_sink.monitor",
-        "-t",
-        "0.15",
-        "-af",
-        "astats=metadata=0:reset=1:measure_perchannel=Peak_level",
-        "-f",
-        "null",
-        "-",
-    ]
+VU = VuMeter()
 
-    try:
-        r = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=3,
-            env=AUDIO_ENV,
-        )
-        text = (r.stdout or "") + "\n" + (r.stderr or "")
-        peaks = [float(x) for x in re.findall(r"Peak level dB:\s*(-?\d+(?:\.\d+)?)", text)]
-
-        if len(peaks) >= 2:
-            left_db, right_db = peaks[0], peaks[1]
-        elif len(peaks) == 1:
-            left_db = right_db = peaks[0]
-        else:
-            return {
-                "left": 0,
-                "right": 0,
-                "left_db": None,
-                "right_db": None,
-            }
 
-        return {
-            "left": db_to_percent(left_db),
-            "right": db_to_percent(right_db),
-            "left_db": left_db,
-            "right_db": right_db,
-        }
-
-    except Exception:
-        return {
-            "left": 0,
-            "right": 0,
-            "left_db": None,
-            "right_db": None,
-        }
+def get_vu_levels():
+    return VU.read()[1]
 
 
 def get_output_status():
@@ -369,6 +507,7 @@ def get_output_status():
         "snapserver": snapserver_on,
         "snapfifo_feed": snapfifo_feed_on,
         "snapcast_state": snapcast_state,
+        "icecast": ICECAST_STATS.snapshot,
     }
 
 
@@ -378,7 +517,8 @@ def control_output(output_name, action):
 
     if output_name == "mp3_stream":
         svc = "shuffle-radio.service"
-        r = run(["sudo", "systemctl", action, svc])
+        r = systemctl(action, svc)
+        ICECAST_STATS.poll()  # get_output_status() below reads this snapshot
         return {
             "ok": r.returncode == 0,
             "output": output_name,
@@ -389,18 +529,18 @@ def control_output(output_name, action):
         results = []
 
         if action == "start":
-            results.append(run(["sudo", "systemctl", "restart", "snapserver.service"]))
-            results.append(run(["sudo", "systemctl", "reset-failed", "shuffle-snapfifo-feed.service"]))
-            results.append(run(["sudo", "systemctl", "restart", "shuffle-snapfifo-feed.service"]))
+            results.append(systemctl("restart", "snapserver.service"))
+            results.append(systemctl("reset-failed", "shuffle-snapfifo-feed.service"))
+            results.append(systemctl("restart", "shuffle-snapfifo-feed.service"))
 
         elif action == "stop":
-            results.append(run(["sudo", "systemctl", "stop", "shuffle-snapfifo-feed.service"]))
-            results.append(run(["sudo", "systemctl", "stop", "snapserver.service"]))
+            results.append(systemctl("stop", "shuffle-snapfifo-feed.service"))
+            results.append(systemctl("stop", "snapserver.service"))
 
         elif action == "restart":
-            results.append(run(["sudo", "systemctl", "restart", "snapserver.service"]))
-            results.append(run(["sudo", "systemctl", "reset-failed", "shuffle-snapfifo-feed.service"]))
-            results.append(run(["sudo", "systemctl", "restart", "shuffle-snapfifo-feed.service"]))
+            results.append(systemctl("restart", "snapserver.service"))
+            results.append(systemctl("reset-failed", "shuffle-snapfifo-feed.service"))
+            results.append(systemctl("restart", "shuffle-snapfifo-feed.service"))
 
         ok = all(r.returncode == 0 for r in results)
         return {
@@ -413,37 +553,17 @@ def control_output(output_name, action):
 
 
 def mpv_command(command):
-    msg = json.dumps({"command": command}) + "\n"
-    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-        s.connect(MPV_SOCKET)
-        s.sendall(msg.encode("utf-8"))
+    resp = MPV.command(*command)
+    # only a dead IPC link is an error here; mpv refusing e.g. playlist-next at the end is not
+    if str(resp.get("error", "")).startswith("mpv_"):
+        raise RuntimeError(resp["error"])
+    return resp
 
 
-def read_nowplaying():
-    if not os.path.exists(NOWPLAYING_JSON):
-        return {
-            "artist": "",
-            "title": "",
-            "album": "",
-            "text": "Nothing loaded",
-            "art_url": "",
-        }
-
-    try:
-        with open(NOWPLAYING_JSON, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        return {
-            "artist": "",
-            "title": "",
-            "album": "",
-            "text": f"Now playing read error: {e}",
-            "art_url": "",
-        }
-
-    artist = str(data.get("artist", "")).strip()
-    title = str(data.get("title", "")).strip()
-    album = str(data.get("album", "")).strip()
+def read_nowplaying(data):
+    artist = str(data.get("artist") or "").strip()
+    title = str(data.get("title") or "").strip()
+    album = str(data.get("album") or "").strip()
 
     if artist and title:
         text = f"{artist} — {title}"
@@ -455,10 +575,20 @@ def read_nowplaying():
         "title": title,
         "album": album,
         "text": text,
-        "art_url": get_nowplaying_art(data),
+        "art_url": get_nowplaying_art(data) if data else "",
     }
 
 
+def nowplaying_response(version, data):
+    """(etag, body) for a state version; cover lookup runs once per track, not per request."""
+    global _NP_RENDERED
+    with _NP_LOCK:
+        if _NP_RENDERED[0] != version:
+            _NP_RENDERED = (version, {**read_nowplaying(data), "version": version})
+        body = _NP_RENDERED[1]
+    return f'"np-{_NP_BOOT}-{version}"', body
+
+
 def get_library_stats():
     db = "/home/dan/jukebox.db"
     music_root = "/mnt/lossless"
@@ -484,6 +614,55 @@ def get_library_stats():
     return result
 
 
+def _run_resync_job(job):
+    global _ACTIVE_JOB
+
+    def progress(stats):
+        job["stats"] = stats.as_dict()
+
+    try:
+        # spawn, not fork: this process is multi-threaded
+        stats = library_index.sync_library(
+            workers=RESYNC_WORKERS,
+            progress=progress,
+            backup_dir=library_index.DB_BACKUP_DIR,  # pruning can drop rows if the NAS mount flickers
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        job.update(state="done", ok=True, output=stats.summary(), stats=stats.as_dict())
+    except Exception as e:
+        job.update(state="failed", ok=False, error=f"Library update failed: {e}")
+    finally:
+        job["finished_at"] = time.time()
+        with _JOBS_LOCK:
+            _ACTIVE_JOB = None
+
+
+def start_resync_job():
+    """Start a background resync, or return the one already running. Returns (job, started)."""
+    global _ACTIVE_JOB
+    with _JOBS_LOCK:
+        if _ACTIVE_JOB is not None:
+            return _ACTIVE_JOB, False
+
+        job_id = f"{int(time.time())}-{next(_JOB_IDS)}"
+        job = {"id": job_id, "kind": "resync", "state": "running", "started_at": time.time(),
+               "finished_at": None, "ok": None, "stats": None}
+        _JOBS[job_id] = job
+        _ACTIVE_JOB = job
+        # only keep the most recent few jobs around
+        while len(_JOBS) > MAX_JOBS:
+            _JOBS.pop(next(iter(_JOBS)))
+
+    threading.Thread(target=_run_resync_job, args=(job,), daemon=True).start()
+    return job, True
+
+
+def get_job(job_id):
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        return dict(job) if job else None
+
+
 DASHBOARD_HTML = """
 <!doctype html>
 <html>
@@ -742,9 +921,15 @@ async function refreshStatus(){
   elAll.className = 'value ' + (all ? 'ok' : 'bad');
 }
 
+let npEtag = null;
+
 async function refreshNowPlaying(){
-  const r = await fetch('/api/nowplaying');
+  // revalidates with the ETag; an unchanged track comes back 304 from the server
+  const r = await fetch('/api/nowplaying', {cache: 'no-cache'});
+  const etag = r.headers.get('ETag');
+  if(etag && etag === npEtag) return;
   const j = await r.json();
+  npEtag = etag;
 
   document.getElementById('npText').textContent = j.text || 'Nothing loaded';
   document.getElementById('npAlbum').textContent = j.album ? ('Album: ' + j.album) : '';
@@ -753,7 +938,7 @@ async function refreshNowPlaying(){
   const placeholder = document.getElementById('coverPlaceholder');
 
   if(j.art_url){
-    img.src = j.art_url + (j.art_url.includes('?') ? '&' : '?') + 't=' + Date.now();
+    img.src = j.art_url;
     img.style.display = 'block';
     placeholder.style.display = 'none';
   } else {
@@ -763,18 +948,20 @@ async function refreshNowPlaying(){
   }
 }
 
+function showVu(j){
+  const l = Math.max(0, Math.min(100, j.left || 0));
+  const rr = Math.max(0, Math.min(100, j.right || 0));
+
+  document.getElementById('vuLeft').style.width = l + '%';
+  document.getElementById('vuRight').style.width = rr + '%';
+  document.getElementById('vuLeftVal').textContent = l + '%';
+  document.getElementById('vuRightVal').textContent = rr + '%';
+}
+
 async function refreshVu(){
   try {
     const r = await fetch('/api/vu');
-    const j = await r.json();
-
-    const l = Math.max(0, Math.min(100, j.left || 0));
-    const rr = Math.max(0, Math.min(100, j.right || 0));
-
-    document.getElementById('vuLeft').style.width = l + '%';
-    document.getElementById('vuRight').style.width = rr + '%';
-    document.getElementById('vuLeftVal').textContent = l + '%';
-    document.getElementById('vuRightVal').textContent = rr + '%';
+    showVu(await r.json());
   } catch(e) {
     document.getElementById('vuLeft').style.width = '0%';
     document.getElementById('vuRight').style.width = '0%';
@@ -805,7 +992,9 @@ async function refreshOutputs(){
   if(j.mp3_stream){
     mp3Status.textContent = 'RUNNING';
     mp3Status.className = 'value ok';
-    mp3Detail.textContent = 'Icecast /stream.mp3 is live';
+    const ice = j.icecast || {};
+    mp3Detail.textContent = 'Icecast /stream.mp3 is live' +
+      (ice.listeners != null ? ` · ${ice.listeners} listener${ice.listeners === 1 ? '' : 's'} (peak ${ice.listener_peak ?? 0})` : '');
   } else {
     mp3Status.textContent = 'STOPPED';
     mp3Status.className = 'value bad';
@@ -874,8 +1063,24 @@ async function updateLibrary(){
 
   const r = await fetch('/api/library/resync', {method:'POST'});
   const j = await r.json();
+  if(!j.ok){
+    out.textContent = 'Error: ' + (j.error || 'Unknown error');
+    return;
+  }
 
-  out.textContent = j.ok ? j.output : ('Error: ' + (j.error || 'Unknown error'));
+  while(true){
+    await new Promise(res => setTimeout(res, 1000));
+    const job = await (await fetch(j.status_url)).json();
+    if(job.state === 'running'){
+      const s = job.stats;
+      out.textContent = s
+        ? `Running… scanned ${s.scanned} | inserted ${s.inserted} | changed ${s.changed} | ${s.files_per_sec} files/s`
+        : 'Running library update…';
+      continue;
+    }
+    out.textContent = job.ok ? job.output : ('Error: ' + (job.error || 'Unknown error'));
+    break;
+  }
   await refreshLibraryStats();
 }
 
@@ -906,7 +1111,12 @@ async function systemCtl(action){
 
 refreshAll();
 setInterval(refreshAll, 3000);
-setInterval(refreshVu, 250);
+if(window.EventSource){
+  // levels are pushed from the server's meter; EventSource reconnects on its own
+  new EventSource('/api/vu/stream').onmessage = (e) => showVu(JSON.parse(e.data));
+} else {
+  setInterval(refreshVu, 250);
+}
 </script>
 </body>
 </html>
@@ -918,14 +1128,53 @@ class Handler(SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=ROOT, **kwargs)
 
-    def _json(self, obj, code=200):
+    def _json(self, obj, code=200, headers=None):
         data = json.dumps(obj).encode("utf-8")
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
         self.end_headers()
         self.wfile.write(data)
 
+    def _nowplaying(self, query):
+        # If-None-Match with the current ETag -> 304; with ?wait=N hold the request
+        # until the track changes (or N seconds pass) before answering
+        version, data = NOWPLAYING.get()
+        etag, body = nowplaying_response(version, data)
+        if self.headers.get("If-None-Match") == etag:
+            try:
+                wait = min(float(query.get("wait", ["0"])[0]), NOWPLAYING_MAX_WAIT)
+            except ValueError:
+                wait = 0
+            if wait > 0:
+                version, data = NOWPLAYING.wait(version, wait)
+                etag, body = nowplaying_response(version, data)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                return
+        return self._json(body, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    def _vu_stream(self):
+        # Server-Sent Events: every client reads the same in-memory levels
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        seq, _ = VU.read()
+        try:
+            while True:
+                time.sleep(1.0 / VU_STREAM_HZ)
+                seq, levels = VU.wait(seq, 2.0)
+                self.wfile.write(f"data: {json.dumps(levels)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
     def do_POST(self):
         u = urlparse(self.path)
 
@@ -943,21 +1192,14 @@ class Handler(SimpleHTTPRequestHandler):
                 return self._json({"ok": True})
 
             if u.path == "/api/library/resync":
-                if not os.path.exists(RESYNC_SCRIPT):
-                    return self._json({"ok": False, "error": f"Script not found: {RESYNC_SCRIPT}"}, 500)
-
-                r = run([RESYNC_SCRIPT])
-                ok = (r.returncode == 0)
-                text = (r.stdout or "").strip()
-                err = (r.stderr or "").strip()
-
-                if ok:
-                    return self._json({"ok": True, "output": text or "Library update complete."})
-
-                return self._json({"ok": False, "error": err or text or "Library update failed."}, 500)
+                # a second request while one is running joins it instead of starting another
+                job, started = start_resync_job()
+                return self._json({"ok": True, "job_id": job["id"], "started": started,
+                                   "status_url": f"/api/library/jobs/{job['id']}"}, 202)
 
             if u.path == "/api/system/restart-icecast":
-                r = run(["sudo", "systemctl", "restart", "icecast2.service"])
+                r = systemctl("restart", "icecast2.service")
+                ICECAST_STATS.poll()  # the next status read shows the restarted server, not the old one
                 return self._json({"ok": r.returncode == 0})
 
             if u.path == "/api/system/reboot":
@@ -992,15 +1234,27 @@ class Handler(SimpleHTTPRequestHandler):
         if u.path == "/api/outputs":
             return self._json(get_output_status())
 
+        if u.path == "/api/icecast":
+            return self._json(ICECAST_STATS.snapshot)
+
         if u.path == "/api/nowplaying":
-            return self._json(read_nowplaying())
+            return self._nowplaying(parse_qs(u.query))
 
         if u.path == "/api/vu":
             return self._json(get_vu_levels())
 
+        if u.path == "/api/vu/stream":
+            return self._vu_stream()
+
         if u.path == "/api/library/stats":
             return self._json(get_library_stats())
 
+        if u.path.startswith("/api/library/jobs/"):
+            job = get_job(u.path[len("/api/library/jobs/"):])
+            if job is None:
+                return self._json({"error": "unknown job"}, 404)
+            return self._json(job)
+
         if u.path.startswith("/api/") and not u.path.startswith("/api/group/") and not u.path.startswith("/api/output/"):
             parts = u.path.strip("/").split("/")
 
@@ -1016,7 +1270,7 @@ class Handler(SimpleHTTPRequestHandler):
                 return self._json({"error": "bad action"}, 400)
 
             svc = SERVICES[key]
-            r = run(["sudo", "systemctl", action, svc])
+            r = systemctl(action, svc)
 
             return self._json({"ok": r.returncode == 0, "active": is_active(svc)})
 
@@ -1038,7 +1292,7 @@ class Handler(SimpleHTTPRequestHandler):
 
             for key in GROUPS[group]:
                 svc = SERVICES[key]
-                r = run(["sudo", "systemctl", action, svc])
+                r = systemctl(action, svc)
                 if r.returncode != 0:
                     ok = False
 
@@ -1058,4 +1312,7 @@ class Handler(SimpleHTTPRequestHandler):
 
 if __name__ == "__main__":
     os.chdir(ROOT)
+    NOWPLAYING.start()
+    ICECAST_STATS.start()
+    PREFETCH.start()
     ThreadingHTTPServer(("0.0.0.0", PORT), Handler).serve_forever()
\ No newline at end of file
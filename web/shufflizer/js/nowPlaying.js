@@ -1,35 +1,60 @@
 export function startNowPlaying({ intervalMs = 1000, onUpdate } = {}) {
   let stopped = false;
-  let lastTs = null;
+  let lastText = null;
+  let etag = null;
+  // control_server.py long-polls: the request is held until the track changes.
+  // Under a plain static server there is no API, so fall back to the JSON file.
+  let useApi = true;
+
+  function handle(j) {
+    const artist = (j?.artist ?? "").toString().trim();
+    const title  = (j?.title  ?? "").toString().trim();
+
+    const text = (artist && title) ? `${artist} — ${title}` : (title || artist || "");
+
+    // Fire when the displayed title changes; a new API version can also mean
+    // only the cover or the playlist position changed
+    if (text && text !== lastText) {
+      lastText = text;
+      onUpdate?.(text);
+    }
+  }
+
+  async function pollApi() {
+    const headers = etag ? { "If-None-Match": etag } : {};
+    const r = await fetch(`/api/nowplaying?wait=25`, { cache: "no-store", headers });
+    if (r.status === 404) {
+      useApi = false;
+      return false;
+    }
+    if (r.status === 304) return true;
+    if (!r.ok) throw new Error(`HTTP ${r.status}`);
+    etag = r.headers.get("ETag");
+    handle(await r.json());
+    return true;
+  }
+
+  async function pollFile() {
+    // Same-origin (served by :8090), avoids CORS
+    const r = await fetch(`/nowplaying.json?_=${Date.now()}`, { cache: "no-store" });
+    if (!r.ok) throw new Error(`HTTP ${r.status}`);
+    handle(await r.json());
+  }
 
   async function tick() {
     if (stopped) return;
 
+    let delay = intervalMs;
     try {
-      // Same-origin (served by :8090), avoids CORS
-      const r = await fetch(`/nowplaying.json?_=${Date.now()}`, { cache: "no-store" });
-      if (!r.ok) throw new Error(`HTTP ${r.status}`);
-      const j = await r.json();
-
-      const ts = j?.ts ?? null;
-      const artist = (j?.artist ?? "").toString().trim();
-      const title  = (j?.title  ?? "").toString().trim();
-
-      const text = (artist && title) ? `${artist} — ${title}` : (title || artist || "");
-
-      // Fire when ts changes (track change), or first time we get data
-      if (ts !== null && ts !== lastTs) {
-        lastTs = ts;
-        if (text) onUpdate?.(text);
-      } else if (lastTs === null && text) {
-        // Initial fill
-        lastTs = ts;
-        onUpdate?.(text);
+      if (useApi && await pollApi()) {
+        delay = 0;  // the server already waited for a change
+      } else {
+        await pollFile();
       }
     } catch (e) {
       console.log('[nowplaying] fetch failed', e);
     } finally {
-      if (!stopped) setTimeout(tick, intervalMs);
+      if (!stopped) setTimeout(tick, delay);
     }
   }
 